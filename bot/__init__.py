@@ -1,5 +1,5 @@
 __all__ = [
-    'bot', 'commands', 'eventsub', 'games', 'gui', 'icons', 'logging_config', 'storage', 'utils', 'web'
+    'bot', 'claims', 'clock', 'commands', 'dbpool', 'effects', 'eventsub', 'fastjson', 'fights', 'games', 'gui', 'icons', 'live', 'logging_config', 'matching', 'questions', 'scheduler', 'shared_limits', 'storage', 'tournament', 'utils', 'web', 'webproc'
 ]
 
 # Package version. Managed by scripts/bump_version.py
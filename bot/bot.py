@@ -7,9 +7,13 @@ from dotenv import load_dotenv
 
 from .storage import Storage
 from .utils import CooldownManager, RateLimiter
+from .shared_limits import SharedLimitsDB, SharedCooldownManager, SharedRateLimiter
+from .effects import TimedEffects
+from .clock import SYSTEM_CLOCK, make_rng
 from .games import BakingGames
 from .commands import CommandHandler
 from .web import create_app
+from .webproc import WebWorkers
 from .eventsub import EventSubServer
 from .logging_config import setup_logging
 from aiohttp import web
@@ -20,6 +24,16 @@ class TwitchContextWrapper:
     async def send(self, message: str):
         await self.ctx.send(message)
 
+class ChannelContext:
+    """Context for the bot's own channel, resolved at send time (used by restored fights)."""
+    def __init__(self, bot, channel: str):
+        self.bot = bot
+        self.channel = channel
+    async def send(self, message: str):
+        ch = self.bot.get_channel(self.channel)
+        if ch:
+            await ch.send(message)
+
 class BakeBot(tcommands.Bot):
     def __init__(self):
         self.logger = setup_logging().getChild("BakeBot")
@@ -35,23 +49,43 @@ class BakeBot(tcommands.Bot):
         self._prefix = prefix
         self._channel = channel
         self.storage = Storage()
-        self.cooldowns = CooldownManager()
-        self.rate_limiter = RateLimiter(max_per_window=8, window_seconds=10)
+        # Shared clock/RNG; set BOT_SEED to make games and rewards replayable
+        self.clock = SYSTEM_CLOCK
+        self.rng = make_rng()
+        self.effects = TimedEffects(self.storage, clock=self.clock)
+        max_keys = int(os.getenv('COOLDOWN_MAX_KEYS', '100000'))
+        if os.getenv('SHARED_LIMITS', 'false').lower() in ('1', 'true', 'yes'):
+            # Several bot processes on one database share cooldowns and rate limits
+            self.shared_limits = SharedLimitsDB(self.storage.db_path)
+            self.cooldowns = SharedCooldownManager(self.shared_limits, effects=self.effects, clock=self.clock,
+                                                   max_keys=max_keys)
+            self.rate_limiter = SharedRateLimiter(self.shared_limits, max_per_window=8, window_seconds=10,
+                                                  clock=self.clock)
+        else:
+            self.shared_limits = None
+            self.cooldowns = CooldownManager(effects=self.effects, clock=self.clock, storage=self.storage,
+                                             max_keys=max_keys)
+            self.rate_limiter = RateLimiter(max_per_window=8, window_seconds=10, clock=self.clock)
         self.web_runner = None
         self.web_site = None
+        self.web_workers: WebWorkers | None = None
         self.eventsub: EventSubServer | None = None
 
         async def award_cb(user):
             self.logger.debug("Award participation XP to %s", user)
             await self.command_handler.award_participation(user)
-        async def win_cb(user):
-            self.logger.info("Game win by %s", user)
-            await self.command_handler.award_win(user)
+        async def win_cb(*users):
+            self.logger.info("Game win by %s", ', '.join(users))
+            await self.command_handler.award_win(*users)
+        async def podium_cb(places):
+            self.logger.info("Podium: %s", ', '.join(places))
+            await self.command_handler.award_podium(places)
 
-        self.games = BakingGames(award_cb, win_cb)
+        self.games = BakingGames(award_cb, win_cb, clock=self.clock, rng=self.rng, storage=self.storage,
+                                 podium_cb=podium_cb)
         self.command_handler = CommandHandler(self.storage, self.games, self.cooldowns, self.rate_limiter, {
             'leaderboard': f"http://{os.getenv('WEB_HOST', '127.0.0.1')}:{os.getenv('WEB_PORT', '8080')}/leaderboard"
-        })
+        }, effects=self.effects, clock=self.clock, rng=self.rng)
         self.logger.info('Bot initialized; prefix=%s channel=%s', self._prefix, channel)
 
         # Default EventSub mapping + cooldowns (can be overridden via metadata)
@@ -65,11 +99,20 @@ class BakeBot(tcommands.Bot):
     async def event_ready(self):
         self.logger.info('Logged in as %s', self.nick)
         await self.storage.init()
+        # Restore Flour Power / Sugar Rush etc. that were active before a restart
+        await self.effects.load()
+        # Persistent cooldowns (e.g. !work) carry over restarts
+        await self.cooldowns.load()
+        # Resume bread fights and challenges that were in progress before a restart
+        await self.games.restore_fights(ChannelContext(self, self._channel))
         # Load season from metadata
         season = await self.storage.get_metadata('season')
         self.logger.debug('Loaded season from metadata: %s', season)
         if season:
             self.games.set_season(season or None)
+        # Question banks can be large; load them in the background instead of delaying startup
+        self._questions_task = asyncio.create_task(
+            self.games.load_question_banks(os.getenv('QUESTION_BANK_DIR'), self.storage))
         await self.start_web()
         # Optionally start EventSub
         if os.getenv('ENABLE_EVENTSUB', 'false').lower() in ('1','true','yes'):
@@ -84,11 +127,13 @@ class BakeBot(tcommands.Bot):
         try:
             if message.echo:
                 return
+            # Stamp on receipt, before any awaits, so game answers are ranked fairly
+            received_at = self.clock.time()
             author = message.author.name.lower()
             self.logger.debug('Message from %s: %s', author, message.content)
             
             # Log chat message for persistence
-            await self.storage.log_chat_message(author, message.content, self._channel)
+            await self.storage.log_chat_message(author, message.content, self._channel, int(received_at))
             
             user = await self.storage.get_or_create_user(author)
             # Check if user is banned
@@ -97,13 +142,14 @@ class BakeBot(tcommands.Bot):
                 return
                 
             # Update last seen
-            await self.storage.set_last_seen(author, int(time.time()))
+            await self.storage.set_last_seen(author, int(self.clock.time()))
             
             # Participation XP once every 15s per user
             if self.cooldowns.check(f"xp:{author}", 15):
                 await self.command_handler.award_participation(author)
             # Games capture
-            resp = await self.games.on_message(author, message.content, TwitchContextWrapper(message.channel), self.storage)
+            resp = await self.games.on_message(author, message.content, TwitchContextWrapper(message.channel), self.storage,
+                                               received_at=received_at)
             if resp:
                 await message.channel.send(resp)
                 return
@@ -170,11 +216,18 @@ class BakeBot(tcommands.Bot):
 
     async def start_web(self):
         try:
-            app = await create_app(self.storage.db_path if hasattr(self.storage, 'db_path') else 'bot_data.sqlite3')
-            runner = web.AppRunner(app)
-            await runner.setup()
+            db_path = self.storage.db_path if hasattr(self.storage, 'db_path') else 'bot_data.sqlite3'
             host = os.getenv('WEB_HOST', '127.0.0.1')
             port = int(os.getenv('WEB_PORT', '8080'))
+            workers = int(os.getenv('WEB_WORKERS', '0'))
+            if workers > 0:
+                # Serve from separate processes so web load can't delay chat handling
+                self.web_workers = WebWorkers(db_path, host, port, workers)
+                await self.web_workers.start()
+                return
+            app = await create_app(db_path)
+            runner = web.AppRunner(app)
+            await runner.setup()
             site = web.TCPSite(runner, host, port)
             await site.start()
             self.web_runner = runner
@@ -185,6 +238,10 @@ class BakeBot(tcommands.Bot):
             raise
 
     async def stop_web(self):
+        if self.web_workers:
+            self.logger.info('Stopping web workers')
+            await self.web_workers.stop()
+            self.web_workers = None
         if self.web_runner:
             self.logger.info('Stopping web server')
             await self.web_runner.cleanup()
@@ -197,6 +254,12 @@ class BakeBot(tcommands.Bot):
 
     async def shutdown(self):
         self.logger.info('Shutdown requested')
+        await self.games.scheduler.stop()
+        await self.games.bread_fight.store.flush()
+        await self.cooldowns.flush()
+        self.logger.info('Cooldown stats: %s', self.cooldowns.stats())
+        if self.shared_limits:
+            self.shared_limits.close()
         await self.stop_web()
         await self.close()
 
@@ -0,0 +1,97 @@
+import json
+import logging
+from typing import Dict, Any, Optional
+
+from .clock import Clock, SYSTEM_CLOCK
+
+logger = logging.getLogger('BakeBot.Claims')
+
+# Built-in periodic claims. Broadcasters can override these or add new ones
+# (e.g. weekly, stream_start) by storing a JSON object under the
+# `claim_types` metadata key:
+#   {"weekly": {"label": "weekly bonus", "reward": 50, "cooldown": 604800},
+#    "stream_start": {"label": "stream bonus", "reward": 5, "cooldown": 21600}}
+DEFAULT_CLAIM_TYPES: Dict[str, Dict[str, Any]] = {
+    'daily': {
+        'label': 'daily bonus',
+        'reward': 10,
+        'cooldown': 86400,
+        # Claiming again within this many seconds of the last claim continues the streak
+        'streak_window': 86400 + 3600,
+        'streak_bonus': 2,
+        'streak_cap': 20,
+    },
+    'hourly': {
+        'label': 'hourly bonus',
+        'reward': 3,
+        'cooldown': 3600,
+    },
+}
+
+_INT_FIELDS = ('reward', 'cooldown', 'streak_window', 'streak_bonus', 'streak_cap')
+
+
+class ClaimEngine:
+    """Periodic token claims (!daily, !hourly, !claim <type>) backed by the claims table.
+
+    The cooldown check, streak update and token credit happen in a single
+    conditional transaction (see `Storage.claim`), so rapid repeat claims
+    cannot both succeed.
+    """
+
+    def __init__(self, storage, clock: Optional[Clock] = None):
+        self.storage = storage
+        self.clock = clock or SYSTEM_CLOCK
+        self._types: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: float = 0.0
+        self._ttl_sec: int = 10
+
+    async def _load_types(self):
+        types = {k: dict(v) for k, v in DEFAULT_CLAIM_TYPES.items()}
+        try:
+            raw = await self.storage.get_metadata('claim_types')
+            if raw:
+                data = json.loads(raw)
+                if isinstance(data, dict):
+                    for name, cfg in data.items():
+                        if isinstance(cfg, dict):
+                            types.setdefault(name.lower(), {}).update(cfg)
+        except Exception:
+            logger.exception('Invalid claim_types metadata; using defaults')
+        for name, cfg in list(types.items()):
+            try:
+                for f in _INT_FIELDS:
+                    cfg[f] = int(cfg.get(f, 0) or 0)
+            except (TypeError, ValueError):
+                logger.warning('Dropping claim type %s with invalid numbers', name)
+                del types[name]
+                continue
+            cfg.setdefault('label', f'{name} bonus')
+            if cfg['cooldown'] <= 0:
+                logger.warning('Dropping claim type %s without a cooldown', name)
+                del types[name]
+        self._types = types
+        self._loaded_at = self.clock.time()
+
+    async def types(self) -> Dict[str, Dict[str, Any]]:
+        if not self._types or (self.clock.time() - self._loaded_at) > self._ttl_sec:
+            await self._load_types()
+        return self._types
+
+    async def get_type(self, name: str) -> Optional[Dict[str, Any]]:
+        return (await self.types()).get(name.lower())
+
+    async def claim(self, username: str, name: str) -> Optional[Dict[str, Any]]:
+        """Attempt a claim. Returns None for unknown claim types, otherwise a dict with
+        `ok`, plus `reward`/`streak`/`streak_bonus`/`tokens` on success or `remaining`
+        (seconds until the next claim) on cooldown."""
+        cfg = await self.get_type(name)
+        if not cfg:
+            return None
+        result = await self.storage.claim(
+            username, name.lower(), int(self.clock.time()),
+            cooldown=cfg['cooldown'], reward=cfg['reward'],
+            streak_window=cfg['streak_window'], streak_bonus=cfg['streak_bonus'], streak_cap=cfg['streak_cap'],
+        )
+        result['label'] = cfg['label']
+        return result
@@ -0,0 +1,81 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from typing import List, Optional, Tuple
+
+
+class Clock:
+    """Wall clock used by games, cooldowns and the economy.
+
+    Components take a clock instead of calling `time.time()` / `asyncio.sleep()`
+    directly so tests and benchmarks can swap in a `VirtualClock`.
+    """
+
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, delay: float):
+        await asyncio.sleep(delay)
+
+
+class VirtualClock(Clock):
+    """Manually advanced clock. `advance()` fast-forwards game time and wakes any
+    coroutines sleeping on it, so hours of rounds run in milliseconds."""
+
+    SETTLE_STEPS = 10
+
+    def __init__(self, start: float = 0.0):
+        self._now = float(start)
+        self._sleepers: List[Tuple[float, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self._now
+
+    async def sleep(self, delay: float):
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._now + delay, next(self._seq), fut))
+        await fut
+
+    async def advance(self, seconds: float):
+        """Move time forward, waking sleepers in deadline order.
+
+        Control is yielded to the loop after each wake-up so that follow-up
+        sleeps scheduled by woken coroutines also fire within the same advance.
+        """
+        target = self._now + seconds
+        # Let freshly scheduled tasks reach their sleep() before we move time
+        await self._settle()
+        while self._sleepers and self._sleepers[0][0] <= target:
+            deadline, _, fut = heapq.heappop(self._sleepers)
+            self._now = max(self._now, deadline)
+            if not fut.done():
+                fut.set_result(None)
+                await self._settle()
+        self._now = target
+
+    async def _settle(self):
+        # A wake-up typically needs a few loop iterations to propagate through
+        # task/wait wrappers before the woken coroutine sleeps again
+        for _ in range(self.SETTLE_STEPS):
+            await asyncio.sleep(0)
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for _, _, f in self._sleepers if not f.done())
+
+
+def make_rng(seed: Optional[str] = None) -> random.Random:
+    """Seedable RNG for games and the economy. Falls back to the BOT_SEED env var;
+    unseeded when neither is set."""
+    seed = seed if seed is not None else os.getenv('BOT_SEED')
+    return random.Random(seed) if seed not in (None, '') else random.Random()
+
+
+SYSTEM_CLOCK = Clock()
@@ -1,10 +1,16 @@
 import asyncio
+import os
 import random
+from collections import Counter
 from typing import Dict, Any, Optional
 import humanize
-import time
 import logging
-import json
+
+from .claims import ClaimEngine
+from .clock import Clock, SYSTEM_CLOCK
+from .effects import DOUBLE_XP, NO_COOLDOWNS
+from .fastjson import loads
+from .utils import ResponseCache
 
 class BakeryShop:
     """Baking-themed shop system for token economy"""
@@ -114,14 +120,22 @@ class BakeryShop:
         }
 
 class CommandHandler:
-    def __init__(self, storage, games, cooldowns, rate_limiter, web_urls: Dict[str, str]):
+    def __init__(self, storage, games, cooldowns, rate_limiter, web_urls: Dict[str, str], effects=None,
+                 clock: Optional[Clock] = None, rng: Optional[random.Random] = None):
         self.storage = storage
+        self.clock = clock or SYSTEM_CLOCK
+        self.rng = rng or random.Random()
         self.games = games
         self.cooldowns = cooldowns
         self.rate_limiter = rate_limiter
+        self._rate_limit_config = None
         self.web_urls = web_urls
+        self.effects = effects
         self.logger = logging.getLogger('BakeBot.Commands')
         self.bakery_shop = BakeryShop()
+        self.claims = ClaimEngine(storage, clock=self.clock)
+        # Rendered !tokens / !level replies, invalidated by Storage's per-user versions
+        self.response_cache = ResponseCache(clock=self.clock)
         
         # Simple mapping for channel point titles -> reward keys used by !redeem
         self.channel_point_map: Dict[str, str] = {
@@ -148,15 +162,15 @@ class CommandHandler:
         }
         # Command toggles
         for k in (
-            'recipe','bakeoff','ovenstatus','leaderboard','guess','oventrivia','seasonal','setseason',
-            'redeem','fight','accept','level','shop','buy','daily','hourly','tokens','gift','work'
+            'recipe','bakeoff','ovenstatus','leaderboard','guess','oventrivia','seasonal','setseason','reloadquestions',
+            'redeem','fight','accept','tournament','join','level','shop','buy','daily','hourly','claim','tokens','gift','work'
         ):
             flags[f'commands.{k}'] = True
         # Game toggles (duplicate of some commands, used for clarity)
-        for k in ('guess_game','trivia_game','seasonal_events','bread_fights'):
+        for k in ('guess_game','trivia_game','seasonal_events','bread_fights','tournaments'):
             flags[f'games.{k}'] = True
         # Economy toggles
-        for k in ('shop','purchases','daily','hourly','work','gifting'):
+        for k in ('shop','purchases','daily','hourly','claims','work','gifting'):
             flags[f'economy.{k}'] = True
         return flags
 
@@ -165,20 +179,38 @@ class CommandHandler:
             raw = await self.storage.get_metadata('feature_flags')
             defaults = self._default_feature_flags()
             if raw:
-                data = json.loads(raw)
+                data = loads(raw)
                 if isinstance(data, dict):
                     defaults.update({k: bool(v) for k, v in data.items()})
             self._feature_flags = defaults
-            self._flags_loaded_at = time.time()
+            self._flags_loaded_at = self.clock.time()
             self.logger.info('Feature flags loaded: %d entries', len(self._feature_flags))
+            await self._load_rate_limits()
         except Exception:
             self.logger.exception('Failed to load feature flags; using defaults')
             self._feature_flags = self._default_feature_flags()
-            self._flags_loaded_at = time.time()
+            self._flags_loaded_at = self.clock.time()
+
+    async def _load_rate_limits(self):
+        # Refreshed together with the feature flags; see RateLimiter.configure for the format
+        config = None
+        try:
+            raw = await self.storage.get_metadata('rate_limits')
+            if raw:
+                config = loads(raw)
+        except Exception:
+            self.logger.warning('Could not load rate_limits from metadata; using defaults')
+        if config != self._rate_limit_config:
+            self._rate_limit_config = config
+            try:
+                self.rate_limiter.configure(config if isinstance(config, dict) else None)
+            except Exception:
+                self.logger.exception('Bad rate_limits config; keeping defaults')
+                self.rate_limiter.configure(None)
 
     async def feature_enabled(self, key: str) -> bool:
         # Lazy-refresh flags
-        now = time.time()
+        now = self.clock.time()
         if not self._feature_flags or (now - self._flags_loaded_at) > self._flags_ttl_sec:
             await self._load_feature_flags()
         # Exact key
@@ -206,13 +238,15 @@ class CommandHandler:
         return False
 
     async def handle(self, ctx, author: str, content: str):
+        # Shed spam first: O(1) token-bucket checks on the raw command word, before parsing or DB work
+        cmd = content.split(None, 1)[0].lower() if content else ''
+        if not self.rate_limiter.allow(author, cmd, getattr(getattr(ctx, 'ctx', None), 'name', None)):
+            self.logger.debug('Rate limit hit for user %s command %s', author, cmd)
+            return
         # Global per-user command cooldown to mitigate spam
-        if not self.cooldowns.check(f"cmd:{author}", 3):
+        if not self.cooldowns.check(f"cmd:{author}", 3, user=author):
             self.logger.debug('Cooldown hit for user %s command %s', author, content)
             return
-        if not self.rate_limiter.allow(author):
-            self.logger.debug('Rate limit hit for user %s', author)
-            return
         parts = content.strip().split()
         if not parts:
             return
@@ -248,6 +282,9 @@ class CommandHandler:
         elif cmd == '!setseason':
             if not await self._guard(ctx, 'commands.setseason', '!setseason'): return
             await self.cmd_setseason(ctx, author, args)
+        elif cmd == '!reloadquestions':
+            if not await self._guard(ctx, 'commands.reloadquestions', '!reloadquestions'): return
+            await self.cmd_reloadquestions(ctx, author)
         elif cmd == '!redeem':
             if not await self._guard(ctx, 'commands.redeem', '!redeem'): return
             await self.cmd_redeem(ctx, author, args)
@@ -259,6 +296,14 @@ class CommandHandler:
             if not await self._guard(ctx, 'commands.accept', '!accept'): return
             if not await self._guard(ctx, 'games.bread_fights', 'Bread fights'): return
             await self.cmd_accept_fight(ctx, author)
+        elif cmd == '!tournament':
+            if not await self._guard(ctx, 'commands.tournament', '!tournament'): return
+            if not await self._guard(ctx, 'games.tournaments', 'Bread fight tournaments'): return
+            await self.cmd_tournament(ctx, author, args)
+        elif cmd == '!join':
+            if not await self._guard(ctx, 'commands.join', '!join'): return
+            if not await self._guard(ctx, 'games.tournaments', 'Bread fight tournaments'): return
+            await self.games.join_tournament(ctx, author, self.storage)
         elif cmd == '!level':
             if not await self._guard(ctx, 'commands.level', '!level'): return
             await self.cmd_level(ctx, author, args)
@@ -280,6 +325,10 @@ class CommandHandler:
             if not await self._guard(ctx, 'commands.hourly', '!hourly'): return
             if not await self._guard(ctx, 'economy.hourly', 'Hourly bonus'): return
             await self.cmd_hourly(ctx, author)
+        elif cmd == '!claim':
+            if not await self._guard(ctx, 'commands.claim', '!claim'): return
+            if not await self._guard(ctx, 'economy.claims', 'Bonus claims'): return
+            await self.cmd_claim(ctx, author, args)
         elif cmd == '!tokens':
             if not await self._guard(ctx, 'commands.tokens', '!tokens'): return
             await self.cmd_tokens(ctx, author, args)
@@ -342,17 +391,14 @@ class CommandHandler:
             await ctx.send(f"{author}, item not found! Check !shop for available items.")
             return
         
-        user_data = await self.storage.get_or_create_user(author)
-        
-        if user_data['tokens'] < item['cost']:
+        # Check, deduct and record in a single transaction
+        balance = await self.storage.purchase(author, item_id, item['cost'], int(self.clock.time()))
+        if balance is None:
+            user_data = await self.storage.get_or_create_user(author)
             await ctx.send(f"{author}, you need {item['cost']} tokens but have {user_data['tokens']}. "
                           f"Earn more with !daily, !hourly, !work, or win games!")
             return
         
-        # Deduct tokens and apply effect
-        await self.storage.add_tokens(author, -item['cost'])
-        await self.storage.record_redemption(author, item_id, item['cost'], int(time.time()))
-        
         # Apply the item's effect
         await self.apply_shop_effect(ctx, author, item['effect'], item)
 
@@ -363,12 +409,11 @@ class CommandHandler:
             await ctx.send(f"?? {author} consumed {item['name']} and gained 100 XP!")
         
         elif effect == 'double_xp_10min':
-            # Store a temporary effect (could be implemented with metadata)
-            await self.storage.set_metadata(f"double_xp_{author}", str(int(time.time()) + 600))
+            await self._activate_effect(author, DOUBLE_XP, 600)
             await ctx.send(f"? {author} activated {item['name']}! Double XP for 10 minutes!")
         
         elif effect == 'no_cooldowns_5min':
-            await self.storage.set_metadata(f"no_cooldowns_{author}", str(int(time.time()) + 300))
+            await self._activate_effect(author, NO_COOLDOWNS, 300)
             await ctx.send(f"?? {author} has {item['name']} active! No cooldowns for 5 minutes!");
         
         elif effect == 'rainbow_chat':
@@ -383,7 +428,7 @@ class CommandHandler:
                 (5, lambda: self.storage.add_xp(author, 100))  # 5% chance: 100 XP jackpot
             ]
             
-            roll = random.randint(1, 100)
+            roll = self.rng.randint(1, 100)
             cumulative = 0
             for chance, reward_func in rewards:
                 cumulative += chance
@@ -400,7 +445,7 @@ class CommandHandler:
                     break
         
         elif effect == 'title_master_baker':
-            await self.storage.set_metadata(f"title_{author}", "Master Baker")
+            await self.storage.set_title(author, "Master Baker")
             await ctx.send(f"?? {author} is now a [Master Baker]! Title will show in special events!")
         
         elif effect == 'recipe_collection':
@@ -409,7 +454,7 @@ class CommandHandler:
                 "Banana Bread", "Apple Pie", "Cinnamon Rolls", "Red Velvet Cake",
                 "Macarons", "Bagels", "Pretzels"
             ]
-            user_recipes = random.sample(recipes, 3)
+            user_recipes = self.rng.sample(recipes, 3)
             await ctx.send(f"?? {author} received these recipes: {', '.join(user_recipes)}!")
         
         else:
@@ -417,65 +462,52 @@ class CommandHandler:
 
     async def cmd_daily(self, ctx, author: str):
         """Claim daily token bonus"""
-        last_daily = await self.storage.get_metadata(f"last_daily_{author}")
-        now = int(time.time())
-        
-        if last_daily:
-            time_since = now - int(last_daily)
-            if time_since < 86400:  # 24 hours
-                remaining = 86400 - time_since
-                hours = remaining // 3600
-                minutes = (remaining % 3600) // 60
-                await ctx.send(f"{author}, daily bonus available in {hours}h {minutes}m!")
-                return
-        
-        # Check for streak bonus
-        streak = 0
-        streak_data = await self.storage.get_metadata(f"daily_streak_{author}")
-        if streak_data:
-            last_streak_day = int(streak_data.split(',')[0])
-            streak_count = int(streak_data.split(',')[1])
-            
-            # If claimed yesterday, continue streak
-            if now - last_streak_day <= 86400 + 3600:  # Allow 1 hour buffer
-                streak = streak_count + 1
-            else:
-                streak = 1
-        else:
-            streak = 1
-        
-        # Calculate rewards
-        base_reward = 10
-        streak_bonus = min(streak * 2, 20)  # Cap at 20 bonus
-        total_reward = base_reward + streak_bonus
-        
-        await self.storage.add_tokens(author, total_reward)
-        await self.storage.set_metadata(f"last_daily_{author}", str(now))
-        await self.storage.set_metadata(f"daily_streak_{author}", f"{now},{streak}")
+        result = await self.claims.claim(author, 'daily')
+        if result is None:
+            return
+        if not result['ok']:
+            remaining = result['remaining']
+            hours = remaining // 3600
+            minutes = (remaining % 3600) // 60
+            await ctx.send(f"{author}, daily bonus available in {hours}h {minutes}m!")
+            return
         
-        await ctx.send(f"?? {author} claimed daily bonus: {total_reward} tokens! "
-                      f"(Streak day {streak}: +{streak_bonus} bonus)")
+        await ctx.send(f"?? {author} claimed daily bonus: {result['reward']} tokens! "
+                      f"(Streak day {result['streak']}: +{result['streak_bonus']} bonus)")
 
     async def cmd_hourly(self, ctx, author: str):
         """Claim hourly token bonus"""
-        last_hourly = await self.storage.get_metadata(f"last_hourly_{author}")
-        now = int(time.time())
-        
-        if last_hourly and now - int(last_hourly) < 3600:
-            remaining = 3600 - (now - int(last_hourly))
-            minutes = remaining // 60
+        result = await self.claims.claim(author, 'hourly')
+        if result is None:
+            return
+        if not result['ok']:
+            minutes = result['remaining'] // 60
             await ctx.send(f"{author}, hourly bonus available in {minutes} minutes!")
             return
         
-        reward = 3
-        await self.storage.add_tokens(author, reward)
-        await self.storage.set_metadata(f"last_hourly_{author}", str(now))
-        
-        await ctx.send(f"? {author} claimed hourly bonus: {reward} tokens!")
+        await ctx.send(f"? {author} claimed hourly bonus: {result['reward']} tokens!")
+
+    async def cmd_claim(self, ctx, author: str, args):
+        """Claim any periodic bonus, including broadcaster-defined ones (weekly, stream_start, ...)"""
+        types = await self.claims.types()
+        if not args:
+            await ctx.send(f"{author}, usage: !claim <{'|'.join(sorted(types))}>")
+            return
+        name = args[0].lower()
+        result = await self.claims.claim(author, name)
+        if result is None:
+            await ctx.send(f"{author}, unknown bonus. Options: {', '.join(sorted(types))}")
+            return
+        if not result['ok']:
+            remaining = result['remaining']
+            await ctx.send(f"{author}, {result['label']} available in {remaining // 3600}h {(remaining % 3600) // 60}m!")
+            return
+        streak = f" (Streak {result['streak']}: +{result['streak_bonus']} bonus)" if result['streak_bonus'] else ''
+        await ctx.send(f"? {author} claimed {result['label']}: {result['reward']} tokens!{streak}")
 
     async def cmd_work(self, ctx, author: str):
         """Work in the bakery for tokens (mini-game)"""
-        if not self.cooldowns.check(f"work:{author}", 300):  # 5 minute cooldown
+        if not self.cooldowns.check(f"work:{author}", 300, user=author):  # 5 minute cooldown
             await ctx.send(f"{author}, you're already tired from work! Rest for a bit.")
             return
         
@@ -488,8 +520,8 @@ class CommandHandler:
             {"name": "inventory counting", "reward": (4, 6), "description": "You organize ingredient supplies"}
         ]
         
-        job = random.choice(jobs)
-        reward = random.randint(job["reward"][0], job["reward"][1])
+        job = self.rng.choice(jobs)
+        reward = self.rng.randint(job["reward"][0], job["reward"][1])
         
         await self.storage.add_tokens(author, reward)
         await ctx.send(f"????? {author} spent time {job['name']}. {job['description']} and earned {reward} tokens!")
@@ -497,10 +529,13 @@ class CommandHandler:
     async def cmd_tokens(self, ctx, author: str, args):
         """Check token balance"""
         target = args[0].lstrip('@').lower() if args else author.lower()
-        user_data = await self.storage.get_or_create_user(target)
         
-        await ctx.send(f"?? {target} has {user_data['tokens']} tokens. "
-                      f"Earn more with !daily, !hourly, !work, or games!")
+        async def render():
+            user_data = await self.storage.get_or_create_user(target)
+            return (f"?? {target} has {user_data['tokens']} tokens. "
+                    f"Earn more with !daily, !hourly, !work, or games!")
+        
+        await ctx.send(await self.response_cache.get(('tokens', target), self.storage.version(target), render))
 
     async def cmd_gift_tokens(self, ctx, author: str, args):
         """Gift tokens to another user"""
@@ -570,30 +605,58 @@ class CommandHandler:
         """Accept a bread fight challenge"""
         await self.games.accept_bread_fight(ctx, author, self.storage)
 
+    async def cmd_tournament(self, ctx, author: str, args):
+        """Open sign-ups for a bread fight tournament (broadcaster only)"""
+        if not self._is_broadcaster(ctx, author):
+            await ctx.send('Only broadcaster can start a tournament.')
+            return
+        try:
+            duration = int(args[0]) if args else 60
+        except ValueError:
+            await ctx.send(f'{author}, usage: !tournament [signup seconds]')
+            return
+        await self.games.open_tournament(ctx, max(10, min(600, duration)))
+
     async def cmd_level(self, ctx, author: str, args):
         """Show player level and stats"""
         target = args[0].lstrip('@').lower() if args else author.lower()
-        user_data = await self.storage.get_or_create_user(target)
         
-        level = self.games.bread_fight.calculate_level(user_data['xp'])
-        health = self.games.bread_fight.calculate_health(level)
-        damage = self.games.bread_fight.calculate_base_damage(level)
-        
-        # Check for special title
-        title = await self.storage.get_metadata(f"title_{target}")
-        title_display = f"[{title}] " if title else ""
+        async def render():
+            user_data = await self.storage.get_or_create_user(target)
+            
+            level = self.games.bread_fight.calculate_level(user_data['xp'])
+            health = self.games.bread_fight.calculate_health(level)
+            damage = self.games.bread_fight.calculate_base_damage(level)
+            
+            # Check for special title
+            title = await self.storage.get_metadata(f"title_{target}")
+            title_display = f"[{title}] " if title else ""
+            
+            return (f"?? {title_display}{target}: Level {level} | {user_data['xp']} XP | {user_data['tokens']} tokens | "
+                    f"{user_data['wins']} wins | Combat: {health}?? {damage}??")
         
-        await ctx.send(f"?? {title_display}{target}: Level {level} | {user_data['xp']} XP | {user_data['tokens']} tokens | "
-                      f"{user_data['wins']} wins | Combat: {health}?? {damage}??")
+        await ctx.send(await self.response_cache.get(('level', target), self.storage.version(target), render))
 
-    async def cmd_setseason(self, ctx, author: str, args):
-        # Simple auth: only broadcaster can change season
-        is_broadcaster = False
+    def _is_broadcaster(self, ctx, author: str) -> bool:
         try:
-            is_broadcaster = getattr(ctx.ctx, 'author', None) and getattr(ctx.ctx.author, 'is_broadcaster', False)
+            if getattr(ctx.ctx, 'author', None) and getattr(ctx.ctx.author, 'is_broadcaster', False):
+                return True
+            # Chat messages are wrapped around the channel, whose name is the broadcaster's login
+            return (getattr(ctx.ctx, 'name', '') or '').lower() == author.lower()
         except Exception:
-            pass
-        if not is_broadcaster:
+            return False
+
+    async def cmd_reloadquestions(self, ctx, author: str):
+        if not self._is_broadcaster(ctx, author):
+            await ctx.send('Only broadcaster can reload question banks.')
+            return
+        # Parsing/indexing happens in a worker thread; chat keeps flowing meanwhile
+        counts = await self.games.load_question_banks(os.getenv('QUESTION_BANK_DIR'), self.storage)
+        await ctx.send('Question banks reloaded: ' + ', '.join(f'{k} {v}' for k, v in counts.items()))
+
+    async def cmd_setseason(self, ctx, author: str, args):
+        # Simple auth: only broadcaster can change season
+        if not self._is_broadcaster(ctx, author):
             await ctx.send('Only broadcaster can change the season.')
             self.logger.warning('Unauthorized setseason attempt by %s', author)
             return
@@ -624,19 +687,15 @@ class CommandHandler:
             self.logger.warning('Unknown reward choice by %s: %s', author, choice)
             return
         
-        user = await self.storage.get_or_create_user(author)
-        
         # Channel point redemptions do not deduct our internal tokens; only !redeem does
-        if getattr(ctx, 'skip_token_check', False) is not True:
-            if user['tokens'] < costs[choice]:
-                await ctx.send(f"{author}, you need {costs[choice]} tokens. You have {user['tokens']}.")
-                self.logger.info('Insufficient tokens for %s: have=%s need=%s', author, user['tokens'], costs[choice])
-                return
-            await self.storage.add_tokens(author, -costs[choice])
-            self.logger.debug('Deducted %s tokens from %s for %s', costs[choice], author, choice)
-        
-        await self.storage.record_redemption(author, choice, costs[choice], int(time.time()))
-        self.logger.info('Redemption recorded: %s by %s cost=%s', choice, author, costs[choice])
+        charge = getattr(ctx, 'skip_token_check', False) is not True
+        balance = await self.storage.purchase(author, choice, costs[choice], int(self.clock.time()), charge=charge)
+        if balance is None:
+            user = await self.storage.get_or_create_user(author)
+            await ctx.send(f"{author}, you need {costs[choice]} tokens. You have {user['tokens']}.")
+            self.logger.info('Insufficient tokens for %s: have=%s need=%s', author, user['tokens'], costs[choice])
+            return
+        self.logger.info('Redemption recorded: %s by %s cost=%s charged=%s balance=%s', choice, author, costs[choice], charge, balance)
         
         if choice == 'xp_boost':
             await self.storage.add_xp(author, rewards[choice])
@@ -644,14 +703,45 @@ class CommandHandler:
         elif choice == 'confetti':
             await ctx.send(f"{author} throws confetti everywhere!")
         elif choice == 'doublexp':
+            await self._activate_effect(author, DOUBLE_XP, 300)
             await ctx.send(f"{author} activated Double XP for 5 minutes!")
         elif choice == 'breadfight':
             await ctx.send(f"?? {author} receives a BREAD FIGHT PASS! Challenge anyone with !fight @username for the next 10 minutes!")
 
+    async def _activate_effect(self, author: str, effect: str, duration: int):
+        if self.effects:
+            await self.effects.activate(author, effect, duration)
+        else:
+            self.logger.warning('No effects engine; %s for %s not applied', effect, author)
+
+    def _xp_multiplier(self, author: str) -> int:
+        if self.effects and self.effects.is_active(author, DOUBLE_XP):
+            return 2
+        return 1
+
+    async def award_xp(self, author: str, amount: int):
+        await self.storage.add_xp(author, amount * self._xp_multiplier(author))
+
+    async def award_tokens(self, author: str, amount: int):
+        await self.storage.add_tokens(author, amount)
+
     async def award_participation(self, author: str):
-        await self.storage.add_xp(author, 1)
+        await self.award_xp(author, 1)
+
+    # (xp, tokens, wins) for 1st, 2nd and 3rd place; later places get the last entry
+    PODIUM_REWARDS = ((25, 5, 1), (15, 3, 0), (10, 2, 0))
+
+    async def award_podium(self, places):
+        """Pay a round's podium (in finishing order) in a single write."""
+        rows = []
+        for i, author in enumerate(places):
+            xp, tokens, wins = self.PODIUM_REWARDS[min(i, len(self.PODIUM_REWARDS) - 1)]
+            rows.append((author, xp * self._xp_multiplier(author), tokens, wins))
+        await self.storage.add_rewards(rows)
 
-    async def award_win(self, author: str):
-        await self.storage.add_xp(author, 25)
-        await self.storage.add_tokens(author, 5)
-        await self.storage.add_win(author)
+    async def award_win(self, *authors: str):
+        """Pay out one win per name given (repeat a name for several wins) in a single write."""
+        wins = Counter(a.lower() for a in authors)
+        await self.storage.add_rewards([
+            (author, 25 * n * self._xp_multiplier(author), 5 * n, n) for author, n in wins.items()
+        ])
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+
+logger = logging.getLogger('BakeBot.DBPool')
+
+
+class ConnectionPool:
+    """A fixed set of read-only connections plus one writer connection.
+
+    Readers are checked out from a queue, so concurrent requests share the
+    same few connections (and their threads) instead of each opening the
+    database. Writes go through the single writer, one at a time. Checkout
+    counts, wait times and saturation are tracked for `stats()`.
+    """
+
+    def __init__(self, db_path: str, readers: int = 4):
+        self.db_path = db_path
+        self.size = max(1, readers)
+        self._idle: Optional[asyncio.Queue] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.peak_in_use = 0
+        self.writes = 0
+        self.write_wait_time = 0.0
+
+    async def open(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.db_path)
+            await conn.execute('PRAGMA query_only = ON')
+            self._readers.append(conn)
+            self._idle.put_nowait(conn)
+        self._writer = await aiosqlite.connect(self.db_path)
+        logger.info('Opened %d reader connections and 1 writer for %s', self.size, self.db_path)
+
+    async def close(self):
+        for conn in self._readers:
+            await conn.close()
+        self._readers.clear()
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    @property
+    def in_use(self) -> int:
+        return self.size - self._idle.qsize() if self._idle else 0
+
+    @asynccontextmanager
+    async def reader(self):
+        start = time.perf_counter()
+        if self._idle.empty():
+            self.waits += 1
+        conn = await self._idle.get()
+        waited = time.perf_counter() - start
+        self.checkouts += 1
+        self.wait_time += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self):
+        start = time.perf_counter()
+        async with self._write_lock:
+            self.writes += 1
+            self.write_wait_time += time.perf_counter() - start
+            try:
+                yield self._writer
+            except BaseException:
+                # Don't leave a half-done transaction on the shared connection
+                await self._writer.rollback()
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'readers': self.size,
+            'in_use': self.in_use,
+            'peak_in_use': self.peak_in_use,
+            'checkouts': self.checkouts,
+            # Checkouts that found every reader busy
+            'waits': self.waits,
+            'saturation': round(self.waits / self.checkouts, 4) if self.checkouts else 0.0,
+            'avg_wait_ms': round(1000 * self.wait_time / self.checkouts, 3) if self.checkouts else 0.0,
+            'max_wait_ms': round(1000 * self.max_wait, 3),
+            'writes': self.writes,
+            'avg_write_wait_ms': round(1000 * self.write_wait_time / self.writes, 3) if self.writes else 0.0,
+        }
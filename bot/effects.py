@@ -0,0 +1,92 @@
+import heapq
+import logging
+from typing import Dict, List, Tuple, Optional
+
+from .clock import Clock, SYSTEM_CLOCK
+
+logger = logging.getLogger('BakeBot.Effects')
+
+# Effect names used by the shop and channel point rewards
+DOUBLE_XP = 'double_xp'
+NO_COOLDOWNS = 'no_cooldowns'
+
+
+class TimedEffects:
+    """In-memory registry of temporary per-user effects (Flour Power, Sugar Rush, ...).
+
+    Active effects are indexed by user for O(1) lookups; a min-heap of expirations
+    lets `sweep` drop expired entries in O(log n) each. Every activation is written
+    through to storage so effects survive a restart (see `load`).
+    """
+
+    def __init__(self, storage=None, clock: Optional[Clock] = None):
+        self.storage = storage
+        self.clock = clock or SYSTEM_CLOCK
+        self._active: Dict[str, Dict[str, float]] = {}
+        self._heap: List[Tuple[float, str, str]] = []
+
+    def _now(self) -> float:
+        return self.clock.time()
+
+    def _set(self, user: str, effect: str, expires_at: float):
+        self._active.setdefault(user, {})[effect] = expires_at
+        heapq.heappush(self._heap, (expires_at, user, effect))
+
+    def is_active(self, user: str, effect: str) -> bool:
+        now = self._now()
+        if self._heap and self._heap[0][0] <= now:
+            self.sweep(now)
+        effects = self._active.get(user.lower())
+        if not effects:
+            return False
+        expires_at = effects.get(effect)
+        return expires_at is not None and expires_at > now
+
+    def remaining(self, user: str, effect: str) -> float:
+        expires_at = self._active.get(user.lower(), {}).get(effect, 0)
+        return max(0.0, expires_at - self._now())
+
+    async def activate(self, user: str, effect: str, duration: float) -> float:
+        """Start (or extend) an effect; returns the new expiry timestamp."""
+        user = user.lower()
+        now = self._now()
+        current = self._active.get(user, {}).get(effect, 0)
+        # Buying the same boost again stacks onto the remaining time
+        expires_at = max(now, current) + duration
+        self._set(user, effect, expires_at)
+        if self.storage:
+            await self.storage.set_effect(user, effect, int(expires_at))
+        logger.debug('Effect %s active for %s until %s', effect, user, int(expires_at))
+        return expires_at
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop expired effects; returns how many were removed."""
+        now = self._now() if now is None else now
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, user, effect = heapq.heappop(self._heap)
+            effects = self._active.get(user)
+            # Heap entries are left behind when an effect is extended; only drop the live one
+            if not effects or effects.get(effect) != expires_at:
+                continue
+            del effects[effect]
+            if not effects:
+                del self._active[user]
+            removed += 1
+        return removed
+
+    async def load(self):
+        """Bulk-load unexpired effects from storage (called on startup)."""
+        if not self.storage:
+            return
+        rows = await self.storage.load_effects(int(self._now()))
+        self._active.clear()
+        self._heap = []
+        for user, effect, expires_at in rows:
+            self._active.setdefault(user, {})[effect] = float(expires_at)
+            self._heap.append((float(expires_at), user, effect))
+        heapq.heapify(self._heap)
+        logger.info('Loaded %d timed effects', len(rows))
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._active.values())
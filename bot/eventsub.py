@@ -1,11 +1,12 @@
 import os
 import hmac
 import hashlib
-import json
 import asyncio
 import logging
 from aiohttp import web, ClientSession
 
+from .fastjson import loads
+
 # Expanded EventSub handler: verifies Twitch signatures and dispatches notifications
 
 class EventSubServer:
@@ -43,12 +44,11 @@ class EventSubServer:
         message_id = request.headers.get('Twitch-Eventsub-Message-Id', '')
         timestamp = request.headers.get('Twitch-Eventsub-Message-Timestamp', '')
         signature = request.headers.get('Twitch-Eventsub-Message-Signature', '')
-        payload = body.decode()
-        computed = 'sha256=' + hmac.new(self.secret.encode(), (message_id + timestamp + payload).encode(), hashlib.sha256).hexdigest()
+        computed = 'sha256=' + hmac.new(self.secret.encode(), (message_id + timestamp).encode() + body, hashlib.sha256).hexdigest()
         if not hmac.compare_digest(signature, computed):
             self.logger.warning('Signature mismatch id=%s ts=%s', message_id, timestamp)
             return web.Response(status=403)
-        data = json.loads(payload)
+        data = loads(body)
         msg_type = request.headers.get('Twitch-Eventsub-Message-Type')
         self.logger.debug('EventSub message type=%s id=%s', msg_type, message_id)
         if msg_type == 'webhook_callback_verification':
@@ -0,0 +1,31 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used instead
+    orjson = None
+
+# Which encoder is in use ('orjson' or 'json'), for logs and benchmarks
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+# Raised by loads() for invalid input with either backend (orjson's error subclasses it)
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, ready to be written to a response or socket."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps_str(obj: Any) -> str:
+    """Like dumps(), for places that store text (e.g. metadata values)."""
+    return dumps(obj).decode('utf-8')
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,203 @@
+import itertools
+import json
+import logging
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .scheduler import Scheduler, TimerHandle
+
+logger = logging.getLogger('BakeBot.Fights')
+
+# Fight phases: waiting for the current player's answer, or paused before the next turn
+PHASE_QUESTION = 'question'
+PHASE_BETWEEN = 'between'
+
+
+@dataclass(slots=True)
+class Challenge:
+    challenger: str
+    target: str
+    challenger_level: int
+    target_level: int
+    expires: float
+    # Runtime-only fields (not checkpointed)
+    timer: Optional[TimerHandle] = field(default=None, repr=False, compare=False)
+
+
+@dataclass(slots=True)
+class FightState:
+    id: int
+    challenger: str
+    target: str
+    challenger_level: int
+    target_level: int
+    challenger_health: int
+    target_health: int
+    challenger_max_health: int
+    target_max_health: int
+    current_turn: str
+    round: int = 1
+    phase: str = PHASE_BETWEEN
+    question: Optional[Dict[str, Any]] = None
+    question_start: float = 0.0
+    # When the pending timer fires: the answer deadline, or the start of the next turn
+    deadline: float = 0.0
+    # Id of the tournament this is a match of (0 for a regular challenge)
+    tournament: int = 0
+    timer: Optional[TimerHandle] = field(default=None, repr=False, compare=False)
+    ctx: Any = field(default=None, repr=False, compare=False)
+
+    def opponent(self, player: str) -> str:
+        return self.target if player == self.challenger else self.challenger
+
+    def level_of(self, player: str) -> int:
+        return self.challenger_level if player == self.challenger else self.target_level
+
+    def health_ratio(self, player: str) -> float:
+        if player == self.challenger:
+            return self.challenger_health / self.challenger_max_health
+        return self.target_health / self.target_max_health
+
+    def damage(self, player: str, amount: int) -> Tuple[int, int]:
+        """Apply damage to `player`; returns (remaining, max) health."""
+        if player == self.challenger:
+            self.challenger_health = max(0, self.challenger_health - amount)
+            return self.challenger_health, self.challenger_max_health
+        self.target_health = max(0, self.target_health - amount)
+        return self.target_health, self.target_max_health
+
+
+_RUNTIME_FIELDS = {'timer', 'ctx'}
+
+
+def _dump(record) -> str:
+    return json.dumps({f.name: getattr(record, f.name) for f in fields(record) if f.name not in _RUNTIME_FIELDS})
+
+
+def _load(cls, raw: str):
+    data = json.loads(raw)
+    known = {f.name for f in fields(cls)} - _RUNTIME_FIELDS
+    return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class FightStore:
+    """Single owner of in-flight fights and pending challenges.
+
+    Each fight is stored once (by id) with a player -> fight id index, and every
+    change is marked dirty and checkpointed to SQLite in batches, so fights
+    and challenges survive restarts (see `restore`).
+    """
+
+    def __init__(self, storage=None, scheduler: Optional[Scheduler] = None, flush_interval: float = 1.0):
+        self.storage = storage
+        self.scheduler = scheduler
+        self.flush_interval = flush_interval
+        self.fights: Dict[int, FightState] = {}
+        self.by_player: Dict[str, int] = {}
+        self.challenges: Dict[str, Challenge] = {}
+        self._ids = itertools.count(1)
+        self._dirty: Set[str] = set()
+        self._flush_timer: Optional[TimerHandle] = None
+
+    # --- lookups -------------------------------------------------------
+    def fight_for(self, player: str) -> Optional[FightState]:
+        fid = self.by_player.get(player)
+        return self.fights.get(fid) if fid is not None else None
+
+    def in_fight(self, player: str) -> bool:
+        return player in self.by_player
+
+    def is_active(self, fight: FightState) -> bool:
+        return self.fights.get(fight.id) is fight
+
+    # --- mutations -----------------------------------------------------
+    def new_id(self) -> int:
+        return next(self._ids)
+
+    def add_fight(self, fight: FightState):
+        self.fights[fight.id] = fight
+        self.by_player[fight.challenger] = fight.id
+        self.by_player[fight.target] = fight.id
+        self.touch(fight)
+
+    def remove_fight(self, fight: FightState):
+        if fight.timer:
+            fight.timer.cancel()
+        if self.fights.pop(fight.id, None) is None:
+            return
+        for p in (fight.challenger, fight.target):
+            if self.by_player.get(p) == fight.id:
+                del self.by_player[p]
+        self._mark(f'fight:{fight.id}')
+
+    def add_challenge(self, challenge: Challenge):
+        self.challenges[challenge.target] = challenge
+        self._mark(f'challenge:{challenge.target}')
+
+    def pop_challenge(self, target: str, challenge: Optional[Challenge] = None) -> Optional[Challenge]:
+        """Remove a pending challenge (only if it is `challenge`, when given)."""
+        current = self.challenges.get(target)
+        if current is None or (challenge is not None and current is not challenge):
+            return None
+        del self.challenges[target]
+        if current.timer:
+            current.timer.cancel()
+        self._mark(f'challenge:{target}')
+        return current
+
+    def touch(self, fight: FightState):
+        """Record that a fight changed so the next checkpoint saves it."""
+        self._mark(f'fight:{fight.id}')
+
+    # --- persistence ---------------------------------------------------
+    def _mark(self, key: str):
+        self._dirty.add(key)
+        if self.storage is None or self.scheduler is None:
+            return
+        if self._flush_timer is None or self._flush_timer.cancelled:
+            self._flush_timer = self.scheduler.call_later(self.flush_interval, self.flush)
+
+    async def flush(self):
+        """Write every fight/challenge changed since the last checkpoint in one transaction."""
+        if not self._dirty or self.storage is None:
+            return
+        dirty, self._dirty = self._dirty, set()
+        upserts: List[Tuple[str, str]] = []
+        deletes: List[str] = []
+        for key in dirty:
+            kind, _, ident = key.partition(':')
+            record = self.fights.get(int(ident)) if kind == 'fight' else self.challenges.get(ident)
+            if record is None:
+                deletes.append(key)
+            else:
+                upserts.append((key, _dump(record)))
+        try:
+            await self.storage.checkpoint_fights(upserts, deletes)
+        except Exception:
+            logger.exception('Fight checkpoint failed; will retry')
+            self._dirty |= dirty
+            if self.scheduler is not None:
+                self._flush_timer = self.scheduler.call_later(self.flush_interval, self.flush)
+
+    async def restore(self) -> Tuple[List[FightState], List[Challenge]]:
+        """Load checkpointed fights/challenges; the caller re-arms their timers."""
+        if self.storage is None:
+            return [], []
+        fights, challenges = [], []
+        for key, raw in await self.storage.load_fights():
+            try:
+                if key.startswith('fight:'):
+                    fight = _load(FightState, raw)
+                    self.fights[fight.id] = fight
+                    self.by_player[fight.challenger] = fight.id
+                    self.by_player[fight.target] = fight.id
+                    fights.append(fight)
+                elif key.startswith('challenge:'):
+                    challenge = _load(Challenge, raw)
+                    self.challenges[challenge.target] = challenge
+                    challenges.append(challenge)
+            except Exception:
+                logger.exception('Dropping unreadable fight checkpoint %s', key)
+        self._ids = itertools.count(max(self.fights, default=0) + 1)
+        logger.info('Restored %d fights and %d challenges', len(fights), len(challenges))
+        return fights, challenges
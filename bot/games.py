@@ -1,14 +1,28 @@
 import asyncio
 import random
-import time
 import math
-from typing import Dict, Optional, List
-from rapidfuzz import fuzz
+import itertools
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, List, Iterable, Set, FrozenSet, Tuple
+
+from .clock import Clock, SYSTEM_CLOCK
+from .matching import AnswerMatcher, normalize
+from .questions import QuestionBank
+from .fights import FightStore, FightState, Challenge, PHASE_QUESTION, PHASE_BETWEEN
+from .scheduler import Scheduler, TimerHandle
+from .tournament import Tournament, MAX_MATCH_TURNS
 
 class BreadFightGame:
-    def __init__(self):
-        self.active_fights: Dict[str, Dict] = {}
-        self.pending_challenges: Dict[str, Dict] = {}
+    # Matchers kept for reuse; a large bank only keeps the recently asked ones
+    MATCHER_CACHE_SIZE = 256
+
+    def __init__(self, clock: Optional[Clock] = None, rng: Optional[random.Random] = None,
+                 store: Optional[FightStore] = None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.rng = rng or random.Random()
+        # In-flight fights and pending challenges, checkpointed to SQLite
+        self.store = store or FightStore()
+        self._matchers: "OrderedDict[Tuple[str, Tuple[str, ...]], AnswerMatcher]" = OrderedDict()
         
         # Bread knowledge questions for damage calculation
         self.fight_questions = [
@@ -23,7 +37,29 @@ class BreadFightGame:
             {"question": "What creates holes in bread?", "answer": "carbon dioxide", "difficulty": 2},
             {"question": "What's the ideal proofing temperature?", "answer": "75-80", "difficulty": 2}
         ]
+        # Built-in questions plus anything loaded from files/DB (see BakingGames.load_question_banks)
+        self.questions = QuestionBank('fight', self.fight_questions, rng=self.rng)
     
+    def pick_question(self, season: Optional[str] = None) -> Dict:
+        return self.questions.sample(season=season) or self.rng.choice(self.fight_questions)
+
+    def matcher_for(self, question: Dict) -> AnswerMatcher:
+        """Matcher for a fight question, reused while it stays in the LRU.
+
+        Keyed on the answer and its aliases, so questions sharing an answer (or a
+        reloaded question with new aliases) never get another question's matcher.
+        """
+        aliases = tuple(question.get('aliases') or ())
+        key = (question['answer'], aliases)
+        m = self._matchers.get(key)
+        if m is None:
+            m = self._matchers[key] = AnswerMatcher(key[0], aliases, cutoff=75)
+            if len(self._matchers) > self.MATCHER_CACHE_SIZE:
+                self._matchers.popitem(last=False)
+        else:
+            self._matchers.move_to_end(key)
+        return m
+
     def calculate_level(self, xp: int) -> int:
         """Calculate level from XP (every 100 XP = 1 level)"""
         return max(1, xp // 100)
@@ -36,32 +72,175 @@ class BreadFightGame:
         """Calculate base damage based on level"""
         return 10 + (level * 2)
 
+# Buffered answer: (server receive time, arrival seq, author, normalized text)
+Answer = Tuple[float, int, str, str]
+
+
+class GameRound:
+    __slots__ = ('id', 'slot', 'kind', 'matcher', 'end', 'win_text', 'players', 'ctx', 'timer',
+                 'podium', 'placed', 'buffer')
+
+    def __init__(self, rid: int, slot: str, kind: str, matcher: AnswerMatcher, end: float, win_text: str,
+                 players: Optional[FrozenSet[str]] = None, ctx=None, podium: int = 1):
+        self.id = rid
+        self.slot = slot
+        self.kind = kind
+        self.matcher = matcher
+        self.end = end
+        self.win_text = win_text
+        self.players = players
+        self.ctx = ctx
+        self.timer: Optional[TimerHandle] = None
+        # Number of correct answerers paid out, and those placed so far (in answer order)
+        self.podium = podium
+        self.placed: List[str] = []
+        # Answers waiting to be scored
+        self.buffer: List[Answer] = []
+
+    @property
+    def answer(self) -> str:
+        return self.matcher.answer
+
+class RoundManager:
+    """Registry of concurrently running guess/trivia/seasonal rounds.
+
+    Each round owns a slot (e.g. 'trivia' or 'guess:team-red') so the same kind
+    can't run twice in one slot, but different slots overlap freely. Rounds are
+    indexed by the normalized line lengths that could possibly match them, so
+    routing a chat line only scores the rounds in its length bucket.
+    """
+
+    def __init__(self):
+        self._rounds: Dict[int, GameRound] = {}
+        self._slots: Dict[str, int] = {}
+        self._by_len: Dict[int, Set[int]] = defaultdict(set)
+        self._unbounded: Set[int] = set()
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self._rounds)
+
+    def __iter__(self):
+        return iter(list(self._rounds.values()))
+
+    def get(self, rid: int) -> Optional[GameRound]:
+        return self._rounds.get(rid)
+
+    def in_slot(self, slot: str) -> Optional[GameRound]:
+        rid = self._slots.get(slot)
+        return self._rounds.get(rid) if rid is not None else None
+
+    def _lengths(self, rnd: GameRound):
+        return range(rnd.matcher.min_len, rnd.matcher.max_len + 1)
+
+    def start(self, slot: str, kind: str, matcher: AnswerMatcher, end: float, win_text: str,
+              players: Optional[Iterable[str]] = None, ctx=None, podium: int = 1) -> Optional[GameRound]:
+        if slot in self._slots:
+            return None
+        players = frozenset(p.lower() for p in players) if players else None
+        rnd = GameRound(next(self._ids), slot, kind, matcher, end, win_text, players, ctx, max(1, podium))
+        self._rounds[rnd.id] = rnd
+        self._slots[slot] = rnd.id
+        if matcher.max_len == math.inf:
+            self._unbounded.add(rnd.id)
+        else:
+            for n in self._lengths(rnd):
+                self._by_len[n].add(rnd.id)
+        return rnd
+
+    def end(self, rid: int) -> Optional[GameRound]:
+        """Remove a round; returns it, or None if it had already ended."""
+        rnd = self._rounds.pop(rid, None)
+        if rnd is None:
+            return None
+        if rnd.timer:
+            rnd.timer.cancel()
+        del self._slots[rnd.slot]
+        if rid in self._unbounded:
+            self._unbounded.discard(rid)
+        else:
+            for n in self._lengths(rnd):
+                bucket = self._by_len[n]
+                bucket.discard(rid)
+                if not bucket:
+                    del self._by_len[n]
+        return rnd
+
+    def candidates(self, author: str, text: str) -> List[GameRound]:
+        """Rounds a normalized line could answer (length bucket and player filter; no scoring)."""
+        rids = self._by_len.get(len(text), ())
+        if self._unbounded:
+            rids = set(rids) | self._unbounded
+        author = author.lower()
+        return [rnd for rnd in map(self._rounds.__getitem__, tuple(rids))
+                if rnd.players is None or author in rnd.players]
+
+    def route(self, author: str, message: str) -> List[GameRound]:
+        """Rounds that `message` from `author` correctly answers."""
+        text = normalize(message)
+        return [rnd for rnd in self.candidates(author, text) if rnd.matcher.score_normalized(text)]
+
 class BakingGames:
-    def __init__(self, award_cb, win_cb):
-        self.current_game: Optional[Dict] = None
+    # Chat answers are scored in batches once they are this old, so a line stamped earlier
+    # but delayed in its handler (e.g. by database awaits) is still ranked first
+    SCORE_GRACE = 0.3
+    # Answers scored per batch before yielding back to the event loop
+    SCORE_CHUNK = 500
+    # Correct answerers paid out per trivia round (1st, 2nd, 3rd...)
+    TRIVIA_PODIUM = 3
+    # Seconds between tournament match starts in a round, and the pause before the next round
+    MATCH_SPACING = 5
+    ROUND_DELAY = 10
+    # Pairings named in a round announcement; the rest are summed up as "+N more"
+    PAIRINGS_SHOWN = 8
+
+    def __init__(self, award_cb, win_cb, clock: Optional[Clock] = None, rng: Optional[random.Random] = None,
+                 scheduler: Optional[Scheduler] = None, storage=None, podium_cb=None):
+        self.rounds = RoundManager()
         self.award_cb = award_cb
         self.win_cb = win_cb
+        # Pays a whole podium in one call; without it only first place is paid via win_cb
+        self.podium_cb = podium_cb
+        self._answer_seq = itertools.count()
+        self._unscored: Set[int] = set()
+        self._score_timer: Optional[TimerHandle] = None
+        self.clock = clock or SYSTEM_CLOCK
+        # Owns every round end, fight turn timeout and challenge expiry
+        self.scheduler = scheduler or Scheduler(self.clock)
+        self.rng = rng or random.Random()
         self.season: Optional[str] = None
-        self.bread_fight = BreadFightGame()
+        self.bread_fight = BreadFightGame(self.clock, self.rng, FightStore(storage, self.scheduler))
+        self.tournament: Optional[Tournament] = None
+        self._tournament_ids = itertools.count(1)
+        self.trivia_questions = QuestionBank('trivia', [
+            {'question': "What temp (F) is commonly used to bake cookies?", 'answer': '350'},
+            {'question': "What ingredient makes bread rise?", 'answer': 'yeast'},
+            {'question': "What does baking soda need to activate?", 'answer': 'acid'},
+        ], rng=self.rng)
+
+    async def load_question_banks(self, directory: Optional[str] = None, storage=None):
+        """(Re)load fight and trivia banks; parsing runs off the event loop."""
+        counts = {}
+        for bank in (self.bread_fight.questions, self.trivia_questions):
+            counts[bank.name] = await bank.reload(directory, storage)
+        return counts
 
     def set_season(self, season: Optional[str]):
         self.season = season
 
-    def _normalize(self, s: str) -> str:
-        return ''.join(ch.lower() for ch in s if ch.isalnum() or ch.isspace()).strip()
-
     async def start_bread_fight_challenge(self, ctx, challenger: str, target: str, storage):
         """Start a bread fight challenge between two players"""
         challenger = challenger.lower()
         target = target.lower()
+        store = self.bread_fight.store
         
         # Check if either player is already in a fight
-        if challenger in self.bread_fight.active_fights or target in self.bread_fight.active_fights:
+        if self._busy(challenger) or self._busy(target):
             await ctx.send(f"{challenger}, one of you is already in a bread fight!")
             return
         
         # Check if there's already a pending challenge
-        if target in self.bread_fight.pending_challenges:
+        if target in store.challenges:
             await ctx.send(f"{target} already has a pending challenge!")
             return
             
@@ -73,112 +252,147 @@ class BakingGames:
         target_level = self.bread_fight.calculate_level(target_data['xp'])
         
         # Create challenge
-        self.bread_fight.pending_challenges[target] = {
-            'challenger': challenger,
-            'challenger_level': challenger_level,
-            'target_level': target_level,
-            'expires': time.time() + 60  # 60 second timeout
-        }
+        challenge = Challenge(challenger, target, challenger_level, target_level,
+                              expires=self.clock.time() + 60)  # 60 second timeout
+        store.add_challenge(challenge)
+        self._arm_challenge(challenge)
         
         await ctx.send(f"???? {challenger} (Level {challenger_level}) challenges {target} (Level {target_level}) to a BREAD FIGHT! "
                       f"{target}, type '!accept' within 60 seconds to accept the challenge!")
-        
-        # Set timeout to clean up pending challenge
-        asyncio.create_task(self._cleanup_challenge(target, 60))
+
+    def _arm_challenge(self, challenge: Challenge):
+        # Clean up the pending challenge once it expires
+        challenge.timer = self.scheduler.call_at(challenge.expires, self._expire_challenge, challenge)
 
     async def accept_bread_fight(self, ctx, accepter: str, storage):
         """Accept a bread fight challenge"""
         accepter = accepter.lower()
+        store = self.bread_fight.store
         
-        if accepter not in self.bread_fight.pending_challenges:
+        challenge = store.pop_challenge(accepter)
+        if challenge is None:
             await ctx.send(f"{accepter}, you don't have any pending challenges!")
             return
         
-        challenge = self.bread_fight.pending_challenges.pop(accepter)
-        
-        if time.time() > challenge['expires']:
+        if self.clock.time() > challenge.expires:
             await ctx.send(f"{accepter}, the challenge has expired!")
             return
         
-        challenger = challenge['challenger']
-        challenger_level = challenge['challenger_level']
-        target_level = challenge['target_level']
+        if self._busy(challenge.challenger) or self._busy(accepter):
+            await ctx.send(f"{accepter}, one of you is already in a bread fight!")
+            return
         
+        await self.start_fight(ctx, challenge.challenger, accepter, challenge.challenger_level, challenge.target_level)
+
+    def _busy(self, player: str) -> bool:
+        """In a fight, or still in a running tournament (waiting for their next match)."""
+        t = self.tournament
+        return self.bread_fight.store.in_fight(player) or (t is not None and player in t.alive)
+
+    async def start_fight(self, ctx, challenger: str, target: str, challenger_level: int, target_level: int) -> FightState:
+        fight = self._create_fight(ctx, challenger, target, challenger_level, target_level)
+        await self._begin_fight(fight)
+        return fight
+
+    def _create_fight(self, ctx, challenger: str, target: str, challenger_level: int, target_level: int,
+                      tournament: int = 0) -> FightState:
         # Calculate health for both players
         challenger_health = self.bread_fight.calculate_health(challenger_level)
         target_health = self.bread_fight.calculate_health(target_level)
         
-        # Create the fight
-        fight_data = {
-            'challenger': challenger,
-            'target': accepter,
-            'challenger_level': challenger_level,
-            'target_level': target_level,
-            'challenger_health': challenger_health,
-            'target_health': target_health,
-            'challenger_max_health': challenger_health,
-            'target_max_health': target_health,
-            'current_turn': challenger,  # Challenger goes first
-            'question': None,
-            'question_start': 0,
-            'turn_timeout': 30,
-            'round': 1
-        }
-        
-        # Add both players to active fights
-        self.bread_fight.active_fights[challenger] = fight_data
-        self.bread_fight.active_fights[accepter] = fight_data
-        
-        await ctx.send(f"???? BREAD FIGHT BEGINS! {challenger} (Level {challenger_level}, {challenger_health}??) vs "
-                      f"{accepter} (Level {target_level}, {target_health}??)")
+        # Create the fight; challenger goes first
+        fight = FightState(
+            id=self.bread_fight.store.new_id(),
+            challenger=challenger, target=target,
+            challenger_level=challenger_level, target_level=target_level,
+            challenger_health=challenger_health, target_health=target_health,
+            challenger_max_health=challenger_health, target_max_health=target_health,
+            current_turn=challenger, tournament=tournament, ctx=ctx,
+        )
+        self.bread_fight.store.add_fight(fight)
+        return fight
+
+    async def _begin_fight(self, fight: FightState):
+        if not self.bread_fight.store.is_active(fight):
+            return
+        challenger, target = fight.challenger, fight.target
+        challenger_level, target_level = fight.challenger_level, fight.target_level
+        challenger_health, target_health = fight.challenger_health, fight.target_health
+        await fight.ctx.send(f"???? BREAD FIGHT BEGINS! {challenger} (Level {challenger_level}, {challenger_health}??) vs "
+                      f"{target} (Level {target_level}, {target_health}??)")
         
         # Start first turn
-        await self._start_fight_turn(ctx, fight_data)
+        await self._start_fight_turn(fight)
 
-    async def _start_fight_turn(self, ctx, fight_data):
+    async def _start_fight_turn(self, fight: FightState):
         """Start a new turn in the bread fight"""
-        current_player = fight_data['current_turn']
-        other_player = fight_data['target'] if current_player == fight_data['challenger'] else fight_data['challenger']
+        if not self.bread_fight.store.is_active(fight):
+            return
+        if fight.tournament and fight.round > MAX_MATCH_TURNS:
+            # Decide a drawn-out tournament match on remaining health (ties go to the higher seed)
+            winner = max((fight.challenger, fight.target), key=fight.health_ratio)
+            await fight.ctx.send(f"? Turn limit reached! {winner} wins on remaining health.")
+            await self._end_bread_fight(fight, winner, fight.opponent(winner))
+            return
+        current_player = fight.current_turn
         
         # Select a random question
-        question_data = random.choice(self.bread_fight.fight_questions)
-        fight_data['question'] = question_data
-        fight_data['question_start'] = time.time()
+        question_data = self.bread_fight.pick_question(season=self.season)
+        fight.question = question_data
+        fight.question_start = self.clock.time()
+        fight.phase = PHASE_QUESTION
+        fight.deadline = fight.question_start + 15
+        self.bread_fight.store.touch(fight)
         
-        await ctx.send(f"?? Round {fight_data['round']}: {current_player}'s turn! "
-                      f"Answer this bread question for damage: **{question_data['question']}** "
-                      f"(Difficulty: {'?' * question_data['difficulty']}) - 15 seconds!")
+        await fight.ctx.send(f"?? Round {fight.round}: {current_player}'s turn! "
+                            f"Answer this bread question for damage: **{question_data['question']}** "
+                            f"(Difficulty: {'?' * question_data['difficulty']}) - 15 seconds!")
         
         # Set timeout for question
-        asyncio.create_task(self._question_timeout(ctx, fight_data, 15))
+        self._arm_fight(fight)
+
+    def _arm_fight(self, fight: FightState):
+        """(Re)schedule the fight's pending timer from its stored deadline."""
+        if fight.timer:
+            fight.timer.cancel()
+        callback = self._question_timeout if fight.phase == PHASE_QUESTION else self._start_fight_turn
+        fight.timer = self.scheduler.call_at(fight.deadline, callback, fight)
+
+    def _next_turn(self, fight: FightState, delay: float = 2):
+        # Switch turns and start the next one after a short delay
+        fight.current_turn = fight.opponent(fight.current_turn)
+        fight.round += 1
+        fight.question = None
+        fight.phase = PHASE_BETWEEN
+        fight.deadline = self.clock.time() + delay
+        self.bread_fight.store.touch(fight)
+        self._arm_fight(fight)
 
     async def handle_bread_fight_answer(self, ctx, author: str, message: str, storage):
         """Handle answers during bread fights"""
         author = author.lower()
         
-        if author not in self.bread_fight.active_fights:
+        fight = self.bread_fight.store.fight_for(author)
+        if fight is None:
             return False
         
-        fight_data = self.bread_fight.active_fights[author]
-        
         # Check if it's this player's turn
-        if fight_data['current_turn'] != author:
+        if fight.current_turn != author:
             return False
         
         # Check if there's an active question
-        if not fight_data['question'] or time.time() > fight_data['question_start'] + 15:
+        if fight.phase != PHASE_QUESTION or not fight.question or self.clock.time() > fight.deadline:
             return False
         
-        question_data = fight_data['question']
+        question_data = fight.question
+        fight.timer.cancel()
         
-        # Check answer accuracy using fuzzy matching
-        accuracy = fuzz.ratio(self._normalize(message), self._normalize(question_data['answer']))
+        # Check answer accuracy using fuzzy matching (0 when below the 75 cutoff)
+        accuracy = self.bread_fight.matcher_for(question_data).score(message)
         
         if accuracy >= 75:  # 75% accuracy required
             # Calculate damage based on accuracy and difficulty
-            base_damage = self.bread_fight.calculate_base_damage(
-                fight_data['challenger_level'] if author == fight_data['challenger'] else fight_data['target_level']
-            )
+            base_damage = self.bread_fight.calculate_base_damage(fight.level_of(author))
             
             # Damage multipliers based on accuracy and difficulty
             accuracy_multiplier = 0.5 + (accuracy / 100)  # 0.75 to 1.5x
@@ -187,48 +401,44 @@ class BakingGames:
             total_damage = int(base_damage * accuracy_multiplier * (1 + difficulty_multiplier))
             
             # Apply damage to opponent
-            other_player = fight_data['target'] if author == fight_data['challenger'] else fight_data['challenger']
+            other_player = fight.opponent(author)
+            remaining_health, max_health = fight.damage(other_player, total_damage)
             
-            if other_player == fight_data['challenger']:
-                fight_data['challenger_health'] = max(0, fight_data['challenger_health'] - total_damage)
-                remaining_health = fight_data['challenger_health']
-                max_health = fight_data['challenger_max_health']
-            else:
-                fight_data['target_health'] = max(0, fight_data['target_health'] - total_damage)
-                remaining_health = fight_data['target_health']
-                max_health = fight_data['target_max_health']
-            
-            await ctx.send(f"? Correct! {author} deals {total_damage} damage to {other_player}! "
-                          f"{other_player} has {remaining_health}/{max_health}?? remaining!")
+            await fight.ctx.send(f"? Correct! {author} deals {total_damage} damage to {other_player}! "
+                                f"{other_player} has {remaining_health}/{max_health}?? remaining!")
             
             # Check for victory
             if remaining_health <= 0:
-                await self._end_bread_fight(ctx, author, other_player, fight_data, storage)
+                await self._end_bread_fight(fight, author, other_player)
                 return True
         else:
-            await ctx.send(f"? Wrong answer, {author}! No damage dealt.")
-        
-        # Switch turns
-        fight_data['current_turn'] = fight_data['target'] if author == fight_data['challenger'] else fight_data['challenger']
-        fight_data['round'] += 1
-        fight_data['question'] = None
-        
-        # Start next turn after a short delay
-        await asyncio.sleep(2)
-        await self._start_fight_turn(ctx, fight_data)
+            await fight.ctx.send(f"? Wrong answer, {author}! No damage dealt.")
         
+        self._next_turn(fight)
         return True
 
-    async def _end_bread_fight(self, ctx, winner: str, loser: str, fight_data, storage):
+    async def _end_bread_fight(self, fight: FightState, winner: str, loser: str):
         """End a bread fight and award rewards"""
         # Remove both players from active fights
-        if winner in self.bread_fight.active_fights:
-            del self.bread_fight.active_fights[winner]
-        if loser in self.bread_fight.active_fights:
-            del self.bread_fight.active_fights[loser]
+        self.bread_fight.store.remove_fight(fight)
+        
+        t = self.tournament
+        if fight.tournament and t is not None and t.id == fight.tournament and t.is_match(fight.id):
+            await fight.ctx.send(f"?? {winner} defeats {loser} and advances in the tournament!")
+            await self.award_cb(loser)
+            # Wins are paid out together when the tournament ends
+            if t.record(fight.id, winner, loser):
+                # Off the answer path, after a breather before the next round
+                delay = self.ROUND_DELAY if len(t.winners) > 1 else 0
+                self.scheduler.call_later(delay, self._advance_tournament, t)
+            return
+        if fight.tournament:
+            # Match of a tournament that no longer exists; its wins were only ever paid in bulk
+            await fight.ctx.send(f"?? {winner} defeats {loser}, but that tournament has already ended.")
+            return
         
-        await ctx.send(f"?? BREAD FIGHT OVER! {winner} defeats {loser} in epic bread combat! "
-                      f"{winner} gains XP and tokens!")
+        await fight.ctx.send(f"?? BREAD FIGHT OVER! {winner} defeats {loser} in epic bread combat! "
+                            f"{winner} gains XP and tokens!")
         
         # Award winner
         await self.win_cb(winner)
@@ -236,69 +446,219 @@ class BakingGames:
         # Small consolation for loser (participation XP)
         await self.award_cb(loser)
 
-    async def _question_timeout(self, ctx, fight_data, timeout):
+    async def _question_timeout(self, fight: FightState):
         """Handle question timeout in bread fights"""
-        await asyncio.sleep(timeout)
-        
-        if fight_data['question'] and time.time() >= fight_data['question_start'] + timeout:
-            current_player = fight_data['current_turn']
-            other_player = fight_data['target'] if current_player == fight_data['challenger'] else fight_data['challenger']
-            
-            await ctx.send(f"? Time's up! {current_player} failed to answer. No damage dealt!")
-            
-            # Switch turns
-            fight_data['current_turn'] = other_player
-            fight_data['round'] += 1
-            fight_data['question'] = None
-            
-            # Start next turn
-            await asyncio.sleep(2)
-            await self._start_fight_turn(ctx, fight_data)
+        if fight.phase != PHASE_QUESTION or not self.bread_fight.store.is_active(fight):
+            return
+        await fight.ctx.send(f"? Time's up! {fight.current_turn} failed to answer. No damage dealt!")
+        self._next_turn(fight)
 
-    async def _cleanup_challenge(self, target: str, timeout: int):
+    def _expire_challenge(self, challenge: Challenge):
         """Clean up expired challenges"""
-        await asyncio.sleep(timeout)
-        if target in self.bread_fight.pending_challenges:
-            del self.bread_fight.pending_challenges[target]
+        self.bread_fight.store.pop_challenge(challenge.target, challenge)
+
+    async def open_tournament(self, ctx, duration: int = 60) -> Optional[Tournament]:
+        """Open tournament sign-ups for `duration` seconds."""
+        if self.tournament is not None:
+            await ctx.send('A bread fight tournament is already running!')
+            return None
+        t = self.tournament = Tournament(next(self._tournament_ids), ctx, self.clock.time() + duration)
+        self.scheduler.call_at(t.closes_at, self._close_signups, t)
+        await ctx.send(f"?? BREAD FIGHT TOURNAMENT! Type '!join' within {duration} seconds to enter. "
+                       f"Brackets are seeded by level!")
+        return t
+
+    async def join_tournament(self, ctx, player: str, storage) -> bool:
+        """Sign a player up; repeat joins are ignored quietly to keep chat readable."""
+        player = player.lower()
+        t = self.tournament
+        if t is None or not t.open:
+            await ctx.send(f"{player}, there's no tournament sign-up open right now!")
+            return False
+        if player in t.entrants:
+            return False
+        if self.bread_fight.store.in_fight(player):
+            await ctx.send(f"{player}, finish your current bread fight before joining!")
+            return False
+        user = await storage.get_or_create_user(player)
+        return t.join(player, self.bread_fight.calculate_level(user['xp']))
+
+    async def _close_signups(self, t: Tournament):
+        if self.tournament is not t:
+            return
+        t.open = False
+        if len(t) < 2:
+            self.tournament = None
+            await t.ctx.send('Not enough bakers joined the tournament. Maybe next time!')
+            return
+        await t.ctx.send(f"?? Sign-ups closed with {len(t)} bakers! Let the tournament begin!")
+        await self._start_tournament_round(t, t.seed(self.rng))
+
+    async def _start_tournament_round(self, t: Tournament, players: List[str]):
+        pairs = t.pair(players)
+        # Register every match before any of them starts so an early finish can't close the round
+        fights = []
+        for slot, (a, b) in enumerate(pairs):
+            if b is None:
+                continue
+            fight = self._create_fight(t.ctx, a, b, t.entrants[a], t.entrants[b], tournament=t.id)
+            t.matches[fight.id] = slot
+            fights.append(fight)
+        # One announcement for the whole round; matches then start a few seconds apart
+        shown = ', '.join(f'{f.challenger} vs {f.target}' for f in fights[:self.PAIRINGS_SHOWN])
+        more = f" +{len(fights) - self.PAIRINGS_SHOWN} more." if len(fights) > self.PAIRINGS_SHOWN else ''
+        bye = f" {pairs[0][0]} gets a bye." if pairs[0][1] is None else ''
+        await t.ctx.send(f"?? Tournament round {t.round}: {len(fights)} match{'es' if len(fights) != 1 else ''}! "
+                         f"{shown}.{more}{bye}")
+        now = self.clock.time()
+        for i, fight in enumerate(fights):
+            fight.timer = self.scheduler.call_at(now + i * self.MATCH_SPACING, self._begin_fight, fight)
 
-    async def start_guess_ingredient(self, ctx, ingredients=None, answer=None, duration=30):
-        if self.current_game:
-            await ctx.send('Another game is already running. Please wait!')
+    async def _advance_tournament(self, t: Tournament):
+        if self.tournament is not t:
             return
+        winners = t.winners
+        if len(winners) > 1:
+            await self._start_tournament_round(t, winners)
+            return
+        self.tournament = None
+        runner_up = f" {t.runner_up} takes second place." if t.runner_up else ''
+        await t.ctx.send(f"?? {winners[0]} is the BREAD FIGHT CHAMPION!{runner_up} "
+                         f"Every match win pays out XP and tokens!")
+        # One batched payout: a player who won three matches is credited three wins
+        await self.win_cb(*t.wins.elements())
+
+    async def restore_fights(self, ctx):
+        """Reload checkpointed fights/challenges after a restart and re-arm their timers.
+
+        Timers resume from the stored deadlines, so a turn whose deadline passed
+        while the bot was down times out straight away. `ctx` is used for fight
+        announcements since the original message context is gone. Tournament
+        brackets aren't checkpointed, so their matches are called off instead.
+        """
+        fights, challenges = await self.bread_fight.store.restore()
+        for challenge in challenges:
+            self._arm_challenge(challenge)
+        cancelled = [f for f in fights if f.tournament]
+        for fight in cancelled:
+            self.bread_fight.store.remove_fight(fight)
+        fights = [f for f in fights if not f.tournament]
+        for fight in fights:
+            fight.ctx = ctx
+            self._arm_fight(fight)
+        if cancelled:
+            await ctx.send(f"?? The bot restarted mid-tournament, so the bread fight tournament was cancelled "
+                           f"({len(cancelled)} match{'es' if len(cancelled) != 1 else ''} called off). "
+                           f"Start a new one any time!")
+        return len(fights), len(challenges)
+
+    async def _run_round(self, ctx, kind: str, answer: str, duration: float, win_text: str, aliases=(),
+                         slot: Optional[str] = None, players: Optional[Iterable[str]] = None,
+                         podium: int = 1) -> Optional[GameRound]:
+        rnd = self.rounds.start(slot or kind, kind, AnswerMatcher(answer, aliases), self.clock.time() + duration,
+                                win_text, players=players, ctx=ctx, podium=podium)
+        if rnd is None:
+            await ctx.send(f'A {kind} round is already running. Please wait!')
+        return rnd
+
+    def _finish_round(self, ctx, rnd: GameRound, timeout_text: str):
+        # Close after the grace period so answers stamped just before the deadline still count
+        rnd.timer = self.scheduler.call_at(rnd.end + self.SCORE_GRACE, self._round_timeout, ctx, rnd.id, timeout_text)
+
+    async def _round_timeout(self, ctx, rid: int, timeout_text: str):
+        rnd = self.rounds.get(rid)
+        if rnd is None:
+            return
+        await self._score_round(rnd, rnd.end)
+        await self._close_round(rnd, timeout_text)
+
+    async def _score_pending(self):
+        """Scheduler callback: score buffered answers that are past the grace period."""
+        self._score_timer = None
+        cutoff = self.clock.time() - self.SCORE_GRACE
+        pending, self._unscored = self._unscored, set()
+        for rid in pending:
+            rnd = self.rounds.get(rid)
+            if rnd is not None:
+                await self._score_round(rnd, cutoff)
+        if self._unscored and self._score_timer is None:
+            self._score_timer = self.scheduler.call_later(self.SCORE_GRACE, self._score_pending)
+
+    async def _score_round(self, rnd: GameRound, cutoff: float):
+        """Score `rnd`'s answers stamped at or before `cutoff`, earliest first."""
+        buffer = rnd.buffer
+        if not buffer:
+            return
+        buffer.sort()
+        n = len(buffer)
+        for i, (stamp, _, _, _) in enumerate(buffer):
+            if stamp > cutoff:
+                n = i
+                break
+        batch, rnd.buffer = buffer[:n], buffer[n:]
+        if rnd.buffer:
+            self._unscored.add(rnd.id)
+        placed = rnd.placed
+        for i, (stamp, _, author, text) in enumerate(batch, 1):
+            if stamp > rnd.end or author in placed:
+                continue
+            if rnd.matcher.score_normalized(text):
+                placed.append(author)
+                if len(placed) >= rnd.podium:
+                    await self._close_round(rnd)
+                    return
+            if i % self.SCORE_CHUNK == 0:
+                await asyncio.sleep(0)
+                if self.rounds.get(rnd.id) is not rnd:
+                    return
+
+    async def _close_round(self, rnd: GameRound, timeout_text: Optional[str] = None):
+        # The round may already have been closed by a full podium or by its timeout
+        if not self.rounds.end(rnd.id):
+            return
+        rnd.buffer = []
+        placed = rnd.placed
+        if not placed:
+            if timeout_text:
+                await rnd.ctx.send(timeout_text)
+            return
+        if rnd.podium == 1:
+            await rnd.ctx.send(rnd.win_text.format(author=placed[0], answer=rnd.answer))
+        else:
+            ranks = ', '.join(f'{i}. {p}' for i, p in enumerate(placed, 1))
+            await rnd.ctx.send(f"Podium: {ranks}! The answer was {rnd.answer}.")
+        if self.podium_cb is not None:
+            await self.podium_cb(placed)
+        else:
+            await self.win_cb(placed[0])
+
+    async def start_guess_ingredient(self, ctx, ingredients=None, answer=None, duration=30, aliases=(),
+                                     slot: Optional[str] = None, players: Optional[Iterable[str]] = None):
         ingredients = ingredients or ['flour', 'sugar', 'butter', 'eggs', 'vanilla', 'baking soda', 'salt', 'cocoa powder']
-        answer = answer or random.choice(ingredients)
-        self.current_game = {
-            'type': 'guess', 'answer': answer, 'end': time.time() + duration,
-            'hint': answer[0] + ('*' * (len(answer) - 1))
-        }
-        await ctx.send(f"Guess the Ingredient! Hint: {self.current_game['hint']} - You have {duration}s. Use chat to guess!")
-        await asyncio.sleep(duration)
-        if self.current_game and time.time() >= self.current_game['end']:
-            await ctx.send(f"Time's up! The ingredient was: {answer}.")
-            self.current_game = None
-
-    async def start_oven_timer_trivia(self, ctx, question=None, answer=None, duration=25):
-        if self.current_game:
-            await ctx.send('Another game is already running. Please wait!')
+        answer = answer or self.rng.choice(ingredients)
+        rnd = await self._run_round(ctx, 'guess', answer, duration, 'Correct, {author}! It was {answer}!',
+                                    aliases, slot, players)
+        if not rnd:
             return
-        qa = [
-            ("What temp (F) is commonly used to bake cookies?", '350'),
-            ("What ingredient makes bread rise?", 'yeast'),
-            ("What does baking soda need to activate?", 'acid')
-        ]
+        hint = answer[0] + ('*' * (len(answer) - 1))
+        await ctx.send(f"Guess the Ingredient! Hint: {hint} - You have {duration}s. Use chat to guess!")
+        self._finish_round(ctx, rnd, f"Time's up! The ingredient was: {answer}.")
+
+    async def start_oven_timer_trivia(self, ctx, question=None, answer=None, duration=25, aliases=(),
+                                      slot: Optional[str] = None, players: Optional[Iterable[str]] = None):
         if not question:
-            question, answer = random.choice(qa)
-        self.current_game = {'type': 'trivia', 'answer': answer, 'end': time.time() + duration}
-        await ctx.send(f"Oven Timer Trivia: {question} - {duration}s to answer!")
-        await asyncio.sleep(duration)
-        if self.current_game:
-            await ctx.send(f"Ding! Time's up. Correct answer: {answer}.")
-            self.current_game = None
-
-    async def start_seasonal_event(self, ctx, duration=25):
-        if self.current_game:
-            await ctx.send('Another game is already running. Please wait!')
+            q = self.trivia_questions.sample(season=self.season)
+            question, answer, aliases = q['question'], q['answer'], q['aliases']
+        rnd = await self._run_round(ctx, 'trivia', answer, duration, 'Correct, {author}!',
+                                    aliases, slot, players, podium=self.TRIVIA_PODIUM)
+        if not rnd:
             return
+        places = f" First {rnd.podium} correct answers score!" if rnd.podium > 1 else ''
+        await ctx.send(f"Oven Timer Trivia: {question} - {duration}s to answer!{places}")
+        self._finish_round(ctx, rnd, f"Ding! Time's up. Correct answer: {answer}.")
+
+    async def start_seasonal_event(self, ctx, duration=25, slot: Optional[str] = None,
+                                   players: Optional[Iterable[str]] = None):
         # Simple seasonal placeholder: themed guess with narrower set
         if self.season == 'halloween':
             items = ['pumpkin', 'cinnamon', 'nutmeg', 'candy corn']
@@ -309,36 +669,39 @@ class BakingGames:
         else:
             items = ['honey', 'lemon', 'almond', 'oat']
             name = 'Seasonal Surprise Ingredient'
-        answer = random.choice(items)
-        self.current_game = {'type': 'seasonal', 'answer': answer, 'end': time.time() + duration}
+        answer = self.rng.choice(items)
+        rnd = await self._run_round(ctx, 'seasonal', answer, duration, 'You got it, {author}!',
+                                    slot=slot, players=players)
+        if not rnd:
+            return
         await ctx.send(f"{name}! Guess it in {duration}s!")
-        await asyncio.sleep(duration)
-        if self.current_game:
-            await ctx.send(f"Seasonal round over! It was: {answer}.")
-            self.current_game = None
+        self._finish_round(ctx, rnd, f"Seasonal round over! It was: {answer}.")
 
-    async def on_message(self, author: str, message: str, ctx=None, storage=None):
+    async def on_message(self, author: str, message: str, ctx=None, storage=None,
+                         received_at: Optional[float] = None):
+        """Route a chat line to a bread fight or buffer it for the open rounds.
+
+        Round answers are only stamped and buffered here; scoring, winner
+        announcements and payouts happen in the batched scorer, which ranks
+        answers by `received_at` (defaults to now) rather than by which handler
+        reached this point first.
+        """
+        stamp = self.clock.time() if received_at is None else received_at
         # First check if this is a bread fight answer
         if storage and await self.handle_bread_fight_answer(ctx, author, message, storage):
             return None
         
-        # Handle regular games
-        if not self.current_game:
+        # Handle regular games: only rounds whose answer length fits this line get it
+        if not self.rounds:
+            return None
+        text = normalize(message)
+        candidates = self.rounds.candidates(author, text)
+        if not candidates:
             return None
-        g = self.current_game
-        if g['type'] == 'guess':
-            if fuzz.ratio(self._normalize(message), self._normalize(g['answer'])) >= 90:
-                self.current_game = None
-                await self.win_cb(author)
-                return f"Correct, {author}! It was {g['answer']}!"
-        elif g['type'] == 'trivia':
-            if fuzz.ratio(self._normalize(message), self._normalize(g['answer'])) >= 90:
-                self.current_game = None
-                await self.win_cb(author)
-                return f"Correct, {author}!"
-        elif g['type'] == 'seasonal':
-            if fuzz.ratio(self._normalize(message), self._normalize(g['answer'])) >= 90:
-                self.current_game = None
-                await self.win_cb(author)
-                return f"You got it, {author}!"
+        entry = (stamp, next(self._answer_seq), author.lower(), text)
+        for rnd in candidates:
+            rnd.buffer.append(entry)
+            self._unscored.add(rnd.id)
+        if self._score_timer is None:
+            self._score_timer = self.scheduler.call_at(stamp + self.SCORE_GRACE, self._score_pending)
         return None
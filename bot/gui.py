@@ -7,13 +7,13 @@ from datetime import datetime
 from dotenv import set_key, load_dotenv
 from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory
 from flask_socketio import SocketIO, emit
-import json
 import socket
 import re
 import requests
 from pathlib import Path
 
 from .bot import BakeBot
+from .fastjson import dumps_str, loads
 from .logging_config import setup_logging
 
 class BotManager:
@@ -379,7 +379,7 @@ def get_feature_flags():
         data = {}
         if raw:
             try:
-                data = json.loads(raw)
+                data = loads(raw)
             except Exception:
                 data = {}
         return jsonify({'success': True, 'flags': data})
@@ -399,7 +399,7 @@ def set_feature_flags():
         store = Storage()
         async def _write():
             await store.init()
-            await store.set_metadata('feature_flags', json.dumps(flags))
+            await store.set_metadata('feature_flags', dumps_str(flags))
         loop = asyncio.new_event_loop()
         try:
             asyncio.set_event_loop(loop)
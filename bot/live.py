@@ -0,0 +1,163 @@
+import asyncio
+import itertools
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .fastjson import dumps
+from .utils import DataVersions
+
+logger = logging.getLogger('BakeBot.Live')
+
+# Queue markers: send every view's current snapshot / end the stream
+RESYNC = object()
+CLOSE = object()
+
+
+def diff_rows(old: List[Any], new: List[Any]) -> Optional[Dict[str, Any]]:
+    """Positional diff: the new length plus [index, row] for every slot that changed."""
+    changed = [[i, row] for i, row in enumerate(new) if i >= len(old) or old[i] != row]
+    if not changed and len(old) == len(new):
+        return None
+    return {'size': len(new), 'set': changed}
+
+
+def sse_event(event: str, data: Dict[str, Any], seq: int) -> bytes:
+    return f'id: {seq}\nevent: {event}\ndata: '.encode('ascii') + dumps(data) + b'\n\n'
+
+
+class Subscriber:
+    __slots__ = ('queue', 'skip_to')
+
+    def __init__(self, buffer: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer)
+        # Events up to this sequence number are already covered by a snapshot
+        self.skip_to = 0
+        self.queue.put_nowait(RESYNC)
+
+
+class LiveFeed:
+    """Pushes leaderboard/recipe changes to connected extension panels.
+
+    One task watches the data versions; when a view moves it is re-read once,
+    diffed against the previous snapshot and encoded once, and the same event
+    is queued for every subscriber. Pushes are at most one per `interval`, so
+    a burst of XP updates goes out as a single diff. Each subscriber's queue
+    holds `buffer` events: a client that falls that far behind has its backlog
+    dropped and is sent fresh snapshots instead. Every `poll` seconds the
+    views are re-read regardless, to pick up writes made by another process.
+    """
+
+    def __init__(self, versions: DataVersions,
+                 sources: Dict[str, Tuple[str, Callable[[], Awaitable[List[Any]]]]],
+                 interval: float = 1.0, poll: float = 10.0, buffer: int = 16):
+        self.versions = versions
+        # event name -> (data version name, loader returning the view's rows)
+        self.sources = sources
+        self.interval = interval
+        self.poll = poll
+        self.buffer = max(1, buffer)
+        self.subscribers: Set[Subscriber] = set()
+        self._snapshots: Dict[str, List[Any]] = {}
+        self._seen: Dict[str, int] = {}
+        self._seq = itertools.count(1)
+        self._last_seq = 0
+        self._lock = asyncio.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.events = 0
+        self.resyncs = 0
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self.versions.listen(self._on_bump)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.versions.unlisten(self._on_bump)
+        self.close_all()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def close_all(self):
+        """End every open stream (on shutdown)."""
+        for sub in self.subscribers:
+            self._drain(sub)
+            sub.queue.put_nowait(CLOSE)
+
+    def _on_bump(self, name: str):
+        if self._wake is not None and any(view == name for view, _ in self.sources.values()):
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll)
+                force = False
+            except asyncio.TimeoutError:
+                force = True
+            self._wake.clear()
+            if self.subscribers:
+                await self.refresh(force)
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self, force: bool = False):
+        """Re-read views whose data version moved (all of them if `force`) and publish the diffs."""
+        async with self._lock:
+            for name, (view, load) in self.sources.items():
+                version = self.versions.get(view)
+                if not force and self._seen.get(name) == version:
+                    continue
+                try:
+                    rows = await load()
+                except Exception:
+                    logger.exception('Failed to load live view %s', name)
+                    continue
+                self._seen[name] = version
+                old = self._snapshots.get(name)
+                self._snapshots[name] = rows
+                change = diff_rows(old, rows) if old is not None else {'size': len(rows), 'set': list(enumerate(rows)), 'reset': True}
+                if change is not None:
+                    self._publish(name, change)
+
+    def _publish(self, name: str, data: Dict[str, Any]):
+        seq = self._last_seq = next(self._seq)
+        event = sse_event(name, data, seq)
+        self.events += 1
+        for sub in self.subscribers:
+            try:
+                sub.queue.put_nowait((seq, event))
+            except asyncio.QueueFull:
+                # Too far behind to catch up event by event; start it over
+                self._drain(sub)
+                sub.queue.put_nowait(RESYNC)
+                self.resyncs += 1
+
+    @staticmethod
+    def _drain(sub: Subscriber):
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+
+    def snapshot_events(self) -> Tuple[int, bytes]:
+        """Every view's current rows as reset events, and the sequence number they cover."""
+        seq = self._last_seq
+        body = b''.join(
+            sse_event(name, {'size': len(rows), 'set': list(enumerate(rows)), 'reset': True}, seq)
+            for name, rows in self._snapshots.items())
+        return seq, body
+
+    async def subscribe(self) -> Subscriber:
+        await self.refresh()
+        sub = Subscriber(self.buffer)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self.subscribers.discard(sub)
+
+    def stats(self) -> Dict[str, int]:
+        return {'subscribers': len(self.subscribers), 'events': self.events, 'resyncs': self.resyncs}
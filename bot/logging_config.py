@@ -14,7 +14,7 @@ LEVEL_MAP = {
     "NOTSET": logging.NOTSET,
 }
 
-def setup_logging():
+def setup_logging(filename: str = "bakebot.log"):
     level_name = os.getenv("LOG_LEVEL", DEFAULT_LEVEL).upper()
     level = LEVEL_MAP.get(level_name, logging.INFO)
 
@@ -32,7 +32,7 @@ def setup_logging():
     ch.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s", datefmt="%H:%M:%S"))
 
     # Rotating file handler
-    fh = RotatingFileHandler(log_dir / "bakebot.log", maxBytes=2_000_000, backupCount=5, encoding="utf-8")
+    fh = RotatingFileHandler(log_dir / filename, maxBytes=2_000_000, backupCount=5, encoding="utf-8")
     fh.setLevel(level)
     fh.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(filename)s:%(lineno)d | %(message)s"))
 
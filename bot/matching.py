@@ -0,0 +1,64 @@
+import math
+import re
+from typing import Iterable, Tuple
+
+from rapidfuzz import fuzz
+
+_STRIP_RE = re.compile(r'[^\w\s]|_')
+
+
+def normalize(s: str) -> str:
+    """Lowercase and drop everything but letters, digits and whitespace."""
+    return _STRIP_RE.sub('', s.lower()).strip()
+
+
+class AnswerMatcher:
+    """Fuzzy matcher for one game answer, built once per round/question.
+
+    The answer and aliases are normalized up front. Because `fuzz.ratio` can
+    only reach `cutoff` when the two strings' lengths are close enough, chat
+    lines outside that length window are rejected before normalization or
+    scoring; the rest go to rapidfuzz with `score_cutoff` so it can bail early.
+    """
+
+    __slots__ = ('answer', 'cutoff', 'choices', 'min_len', 'max_len')
+
+    def __init__(self, answer: str, aliases: Iterable[str] = (), cutoff: float = 90):
+        self.answer = answer
+        self.cutoff = cutoff
+        choices = []
+        for a in (answer, *aliases):
+            n = normalize(a)
+            if n and n not in choices:
+                choices.append(n)
+        self.choices: Tuple[str, ...] = tuple(choices)
+        # ratio = 200 * matches / (len_a + len_b) and matches <= min(len_a, len_b)
+        lens = [len(c) for c in self.choices] or [0]
+        if cutoff > 0:
+            self.min_len = math.ceil(min(lens) * cutoff / (200 - cutoff))
+            self.max_len = math.floor(max(lens) * (200 - cutoff) / cutoff)
+        else:
+            self.min_len, self.max_len = 0, math.inf
+
+    def score(self, message: str) -> float:
+        """Best ratio against the answer/aliases, or 0 if below the cutoff."""
+        # Normalizing never lengthens a line, so too-short raw input can't match
+        if len(message) < self.min_len:
+            return 0
+        return self.score_normalized(normalize(message))
+
+    def score_normalized(self, text: str) -> float:
+        """Like `score` for a line that was already passed through `normalize`."""
+        if not (self.min_len <= len(text) <= self.max_len):
+            return 0
+        best = 0
+        for choice in self.choices:
+            s = fuzz.ratio(text, choice, score_cutoff=max(self.cutoff, best))
+            if s > best:
+                best = s
+                if best == 100:
+                    break
+        return best
+
+    def matches(self, message: str) -> bool:
+        return self.score(message) > 0
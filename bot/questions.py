@@ -0,0 +1,180 @@
+import asyncio
+import csv
+import json
+import logging
+import random
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger('BakeBot.Questions')
+
+BANK_SUFFIXES = ('.json', '.jsonl', '.csv')
+
+# (difficulty, category id, season id); None means "any" and id 0 means untagged
+IndexKey = Tuple[Optional[int], Optional[int], Optional[int]]
+
+
+class _BankData:
+    """Immutable, array-backed question storage plus its lookup indexes."""
+
+    __slots__ = ('questions', 'answers', 'aliases', 'difficulty', 'category', 'season',
+                 'categories', 'seasons', 'index')
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.aliases: Dict[int, Tuple[str, ...]] = {}
+        self.difficulty = array('B')
+        self.category = array('H')
+        self.season = array('H')
+        # Interned labels; id 0 is reserved for untagged
+        self.categories: Dict[str, int] = {'': 0}
+        self.seasons: Dict[str, int] = {'': 0}
+        self.index: Dict[IndexKey, array] = {}
+        for row in rows:
+            try:
+                self._add(row)
+            except (TypeError, ValueError, AttributeError):
+                logger.warning('Skipping malformed question row: %r', row)
+
+    def _intern(self, table: Dict[str, int], label: str) -> int:
+        label = (label or '').strip().lower()
+        if label not in table:
+            table[label] = len(table)
+        return table[label]
+
+    def _add(self, row: Dict[str, Any]):
+        question = str(row.get('question') or '').strip()
+        answer = str(row.get('answer') or '').strip()
+        if not question or not answer:
+            return
+        d = max(1, min(255, int(row.get('difficulty') or 1)))
+        aliases = row.get('aliases') or ()
+        if isinstance(aliases, str):
+            aliases = [a for a in aliases.split('|') if a.strip()]
+        c = self._intern(self.categories, row.get('category'))
+        s = self._intern(self.seasons, row.get('season'))
+        i = len(self.questions)
+        self.questions.append(question)
+        self.answers.append(answer)
+        if aliases:
+            self.aliases[i] = tuple(aliases)
+        self.difficulty.append(d)
+        self.category.append(c)
+        self.season.append(s)
+        # Register under every wildcard combination so any filter is a single dict lookup
+        for key in [(dd, cc, ss) for dd in (None, d) for cc in (None, c) for ss in (None, s)]:
+            bucket = self.index.get(key)
+            if bucket is None:
+                bucket = self.index[key] = array('I')
+            bucket.append(i)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def get(self, i: int) -> Dict[str, Any]:
+        return {
+            'question': self.questions[i],
+            'answer': self.answers[i],
+            'aliases': self.aliases.get(i, ()),
+            'difficulty': self.difficulty[i],
+        }
+
+
+class QuestionBank:
+    """Question bank indexed by difficulty, category and season.
+
+    `sample()` is O(1) and never repeats a question within a session until the
+    matching pool is exhausted (an incremental Fisher-Yates shuffle bag per
+    filter). `reload()` parses and indexes in a worker thread, then swaps the
+    new data in atomically so chat handling never waits on it.
+    """
+
+    def __init__(self, name: str, defaults: Iterable[Dict[str, Any]] = (), rng: Optional[random.Random] = None):
+        self.name = name
+        self.rng = rng or random.Random()
+        self._defaults = list(defaults)
+        self._data = _BankData(self._defaults)
+        self._bags: Dict[IndexKey, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def sample(self, difficulty: Optional[int] = None, category: Optional[str] = None,
+               season: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Draw the next unseen question matching the filters.
+
+        A season with no tagged questions falls back to untagged ones, then to the
+        whole bank, so setting a season never starves the games.
+        """
+        data = self._data
+        d = int(difficulty) if difficulty else None
+        c = None
+        if category:
+            c = data.categories.get(category.lower())
+            if c is None:
+                return None
+        if season:
+            sid = data.seasons.get(season.lower())
+            seasons = ((sid,) if sid else ()) + (0, None)
+        else:
+            seasons = (None,)
+        for s in seasons:
+            key = (d, c, s)
+            pool = data.index.get(key)
+            if pool:
+                return data.get(self._draw(key, pool))
+        return None
+
+    def _draw(self, key, pool: array) -> int:
+        bag = self._bags.get(key)
+        if bag is None:
+            bag = self._bags[key] = [array('I', pool), 0]
+        items, pos = bag
+        n = len(items)
+        if pos >= n:
+            pos = 0  # everything has been asked once; start a new cycle
+        j = self.rng.randrange(pos, n)
+        items[pos], items[j] = items[j], items[pos]
+        bag[1] = pos + 1
+        return items[pos]
+
+    def reset_session(self):
+        self._bags.clear()
+
+    @staticmethod
+    def read_files(paths: Iterable[Path]) -> List[Dict[str, Any]]:
+        """Parse JSON (list of objects), JSONL or CSV question files."""
+        rows: List[Dict[str, Any]] = []
+        for path in paths:
+            try:
+                if path.suffix == '.csv':
+                    with path.open(newline='', encoding='utf-8') as f:
+                        rows.extend(csv.DictReader(f))
+                elif path.suffix == '.jsonl':
+                    with path.open(encoding='utf-8') as f:
+                        rows.extend(json.loads(line) for line in f if line.strip())
+                else:
+                    data = json.loads(path.read_text(encoding='utf-8'))
+                    rows.extend(data if isinstance(data, list) else data.get('data', []))
+            except Exception:
+                logger.exception('Failed to read question file %s', path)
+        return rows
+
+    async def reload(self, directory: Optional[str] = None, storage=None) -> int:
+        """Rebuild the bank from built-in defaults, `<directory>/<name>/*` files and
+        the `questions` table, off the event loop. Returns the new size."""
+        rows: List[Dict[str, Any]] = list(self._defaults)
+        if directory:
+            folder = Path(directory) / self.name
+            if folder.is_dir():
+                paths = sorted(p for p in folder.iterdir() if p.suffix in BANK_SUFFIXES)
+                rows.extend(await asyncio.to_thread(self.read_files, paths))
+        if storage is not None:
+            rows.extend(await storage.load_questions(self.name))
+        data = await asyncio.to_thread(_BankData, rows)
+        self._data = data
+        self._bags = {}
+        logger.info('Question bank %s loaded: %d questions', self.name, len(data))
+        return len(data)
@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+from .clock import Clock, SYSTEM_CLOCK
+
+logger = logging.getLogger('BakeBot.Scheduler')
+
+
+class TimerHandle:
+    __slots__ = ('when', 'callback', 'args', 'cancelled', '_scheduler')
+
+    def __init__(self, when: float, callback: Callable, args: tuple, scheduler: 'Scheduler'):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._scheduler = scheduler
+
+    def cancel(self):
+        """O(1): the heap entry is skipped (and eventually compacted) instead of removed."""
+        if not self.cancelled:
+            self.cancelled = True
+            self._scheduler._cancelled += 1
+
+
+class Scheduler:
+    """Single-task timer queue for round ends, fight turn timeouts and challenge expiries.
+
+    Timers sit in one min-heap drained by one background task, so thousands of
+    pending timers cost one task rather than one sleeping coroutine each.
+    Coroutine callbacks are spawned as their own task when they fire so a slow
+    callback never delays the next timer.
+    """
+
+    def __init__(self, clock: Optional[Clock] = None):
+        self.clock = clock or SYSTEM_CLOCK
+        self._heap: List[Tuple[float, int, TimerHandle]] = []
+        self._seq = itertools.count()
+        self._cancelled = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Coroutine callbacks still running; the loop only keeps weak references to tasks
+        self._running: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    def call_at(self, when: float, callback: Callable, *args: Any) -> TimerHandle:
+        handle = TimerHandle(when, callback, args, self)
+        first = not self._heap or when < self._heap[0][0]
+        heapq.heappush(self._heap, (when, next(self._seq), handle))
+        self._ensure_running()
+        if first:
+            self._wake.set()
+        return handle
+
+    def call_later(self, delay: float, callback: Callable, *args: Any) -> TimerHandle:
+        return self.call_at(self.clock.time() + delay, callback, *args)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop firing timers and cancel callbacks that are still running."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        self._running.clear()
+
+    def _compact(self):
+        self._heap = [e for e in self._heap if not e[2].cancelled]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    def _run_due(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            _, _, handle = heapq.heappop(self._heap)
+            if handle.cancelled:
+                self._cancelled -= 1
+                continue
+            handle.cancelled = True  # fired; a late cancel() is a no-op
+            try:
+                result = handle.callback(*handle.args)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.ensure_future(self._guard(result))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+            except Exception:
+                logger.exception('Timer callback %r failed', handle.callback)
+
+    async def _guard(self, coro):
+        try:
+            await coro
+        except Exception:
+            logger.exception('Timer coroutine failed')
+
+    async def _run(self):
+        while True:
+            if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+                self._compact()
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled -= 1
+            self._wake.clear()
+            if not self._heap:
+                await self._wake.wait()
+                continue
+            delay = self._heap[0][0] - self.clock.time()
+            if delay > 0:
+                # Sleep on the clock (so a VirtualClock can drive us) unless an earlier timer arrives
+                sleeper = asyncio.ensure_future(self.clock.sleep(delay))
+                waker = asyncio.ensure_future(self._wake.wait())
+                try:
+                    await asyncio.wait((sleeper, waker), return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    sleeper.cancel()
+                    waker.cancel()
+                continue
+            self._run_due(self.clock.time())
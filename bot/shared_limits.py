@@ -0,0 +1,256 @@
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .effects import NO_COOLDOWNS
+from .utils import CooldownManager, RateLimiter
+
+logger = logging.getLogger('BakeBot.SharedLimits')
+
+# Longest a check waits on another writer's lock (seconds); the bot's own writes take about this long
+BUSY_TIMEOUT = 0.005
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS shared_cooldowns (
+    key TEXT PRIMARY KEY,
+    last REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shared_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    last REAL NOT NULL
+);
+'''
+
+
+class SharedLimitsDB:
+    """Cooldown and rate-limit rows shared by every process using the same database.
+
+    `check()`/`allow()` are synchronous, so this uses a plain sqlite3
+    connection: each call is one short local transaction, and callers only
+    reach it when their local cache can't answer on its own. It runs on the
+    event loop, so it waits at most `busy_timeout` for another writer's lock
+    and retries a busy database once; only then does sqlite3.OperationalError
+    reach the caller, which denies.
+    """
+
+    def __init__(self, db_path: str, busy_timeout: float = BUSY_TIMEOUT):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.errors = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _run(self, fn, *args):
+        """Call fn(db, *args) under the lock, retrying once if the database was busy."""
+        with self._lock:
+            self.queries += 1
+            db = self._db()
+            try:
+                return fn(db, *args)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e):
+                    raise
+                logger.debug('Shared limits database busy (%s); retrying once', e)
+            return fn(db, *args)
+
+    def claim_cooldown(self, key: str, now: float, seconds: float) -> Tuple[bool, float, float]:
+        """Atomically start `key`'s cooldown unless another process holds it.
+
+        Returns (claimed, last, expires_at) with the row as it now stands.
+        """
+        return self._run(self._claim, key, now, seconds)
+
+    @staticmethod
+    def _claim(db: sqlite3.Connection, key: str, now: float, seconds: float) -> Tuple[bool, float, float]:
+        cur = db.execute(
+            'INSERT INTO shared_cooldowns(key, last, expires_at) VALUES (?,?,?) '
+            'ON CONFLICT(key) DO UPDATE SET last=excluded.last, expires_at=excluded.expires_at '
+            'WHERE excluded.last - shared_cooldowns.last >= ?',
+            (key, now, now + seconds, seconds))
+        if cur.rowcount:
+            return True, now, now + seconds
+        row = db.execute('SELECT last, expires_at FROM shared_cooldowns WHERE key = ?', (key,)).fetchone()
+        return False, row[0], row[1]
+
+    def lease(self, requests: List[Tuple[str, int, float, int]], now: float) -> Dict[str, int]:
+        """Take up to `want` tokens from each shared bucket in one transaction.
+
+        `requests` holds (key, capacity, window, want); returns key -> tokens granted.
+        """
+        return self._run(self._lease, requests, now)
+
+    @staticmethod
+    def _lease(db: sqlite3.Connection, requests: List[Tuple[str, int, float, int]], now: float) -> Dict[str, int]:
+        granted: Dict[str, int] = {}
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for key, capacity, window, want in requests:
+                row = db.execute('SELECT tokens, last FROM shared_buckets WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    available = float(capacity)
+                else:
+                    available = min(capacity, row[0] + (now - row[1]) * capacity / window)
+                take = min(want, int(available))
+                db.execute('INSERT INTO shared_buckets(key, tokens, last) VALUES (?,?,?) '
+                           'ON CONFLICT(key) DO UPDATE SET tokens=excluded.tokens, last=excluded.last',
+                           (key, available - take, now))
+                granted[key] = take
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return granted
+
+    def prune(self, now: float, idle_seconds: float):
+        with self._lock:
+            db = self._db()
+            db.execute('DELETE FROM shared_cooldowns WHERE expires_at <= ?', (now,))
+            db.execute('DELETE FROM shared_buckets WHERE last <= ?', (now - idle_seconds,))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    msg = str(e)
+    return 'locked' in msg or 'busy' in msg
+
+
+class SharedCooldownManager(CooldownManager):
+    """CooldownManager whose cooldowns hold across processes.
+
+    The in-memory store acts as a read cache: a key known to be cooling down
+    is rejected locally, and the database is only asked (with one atomic
+    upsert) when this process believes the key is free.
+    """
+
+    def __init__(self, db: SharedLimitsDB, **kwargs):
+        kwargs['storage'] = None  # every cooldown is already shared through `db`
+        super().__init__(**kwargs)
+        self.db = db
+        self._next_prune = 0.0
+
+    def check(self, key: str, seconds: float, user: Optional[str] = None) -> bool:
+        if user and self.effects and self.effects.is_active(user, NO_COOLDOWNS):
+            return True
+        now = self.clock.time()
+        self._expire(now)
+        entry = self._cooldowns.get(key)
+        if entry is not None and now - entry[0] < seconds:
+            return False
+        if seconds <= 0:
+            return True
+        try:
+            claimed, last, expires = self.db.claim_cooldown(key, now, seconds)
+        except sqlite3.Error as e:
+            # Still busy after a retry, or a real failure: deny rather than risk granting twice.
+            # Nothing is cached locally, so the next check asks the database again.
+            self.db.errors += 1
+            logger.debug('Shared cooldown check for %s failed (%s); denying', key, e)
+            return False
+        self._set(key, last, expires, persist=False)
+        if now >= self._next_prune:
+            self._next_prune = now + 300
+            try:
+                self.db.prune(now, 300)
+            except sqlite3.Error:
+                logger.exception('Failed to prune shared cooldowns')
+        return claimed
+
+    def stats(self) -> Dict[str, int]:
+        stats = super().stats()
+        stats['db_queries'] = self.db.queries
+        stats['db_errors'] = self.db.errors
+        return stats
+
+
+class SharedRateLimiter(RateLimiter):
+    """RateLimiter whose buckets are shared across processes.
+
+    Each process leases a few tokens at a time from the shared bucket and
+    spends them locally, so most checks never touch the database. Leased
+    tokens are already taken from the shared bucket, so processes together
+    never exceed a limit. Unused leases lapse after one window, and after an
+    empty lease the bucket isn't asked again until a token could have refilled.
+    """
+
+    def __init__(self, db: SharedLimitsDB, *args, lease_fraction: float = 0.25, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db = db
+        self.lease_fraction = lease_fraction
+        # (scope, key) -> [leased tokens, lease expiry, don't ask the db again before]
+        self._leases: Dict[Tuple[str, Optional[str]], List[float]] = {}
+
+    def configure(self, config):
+        super().configure(config)
+        self._leases.clear()
+
+    def allow(self, user: str, command: Optional[str] = None, channel: Optional[str] = None) -> bool:
+        now = self.clock.time()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        layers = []
+        needed = []
+        for scope, key, (capacity, window) in self._layers(user, command, channel):
+            lease = self._leases.get((scope, key))
+            if lease is None or lease[1] <= now:
+                lease = self._leases[(scope, key)] = [0, now + window, 0.0]
+            if lease[0] < 1:
+                if now < lease[2]:
+                    self.rejected += 1
+                    return False
+                want = max(1, int(capacity * self.lease_fraction))
+                needed.append((f'{scope}:{key or ""}', capacity, window, want, lease))
+            layers.append(lease)
+        if needed:
+            try:
+                granted = self.db.lease([n[:4] for n in needed], now)
+            except sqlite3.Error as e:
+                # Fail closed: tokens already leased still count, but none are invented
+                self.db.errors += 1
+                logger.debug('Shared rate limit lease failed (%s); denying', e)
+                self.rejected += 1
+                return False
+            for name, capacity, window, _, lease in needed:
+                lease[0] += granted.get(name, 0)
+                if lease[0] < 1:
+                    lease[2] = now + window / capacity
+            if any(lease[0] < 1 for *_, lease in needed):
+                self.rejected += 1
+                return False
+        for lease in layers:
+            lease[0] -= 1
+        self.allowed += 1
+        return True
+
+    def _sweep(self, now: float):
+        for key in [k for k, lease in self._leases.items() if lease[1] <= now]:
+            del self._leases[key]
+        try:
+            self.db.prune(now, self.idle_seconds)
+        except sqlite3.Error:
+            logger.exception('Failed to prune shared limits')
+        self._next_sweep = now + self.idle_seconds
+
+    def __len__(self) -> int:
+        return len(self._leases)
+
+    def stats(self) -> Dict[str, int]:
+        return {'leases': len(self._leases), 'allowed': self.allowed, 'rejected': self.rejected,
+                'db_queries': self.db.queries, 'db_errors': self.db.errors}
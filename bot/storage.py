@@ -1,6 +1,9 @@
 import aiosqlite
 import asyncio
-from typing import Optional, Dict, Any, List
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from .utils import DATA_VERSIONS
 
 DB_PATH = 'bot_data.sqlite3'
 
@@ -15,6 +18,8 @@ CREATE TABLE IF NOT EXISTS users (
     notes TEXT DEFAULT '',
     is_banned INTEGER DEFAULT 0
 );
+-- Leaderboard order and keyset paging for /api/users
+CREATE INDEX IF NOT EXISTS idx_users_xp_username ON users(xp DESC, username);
 
 CREATE TABLE IF NOT EXISTS redemptions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -37,15 +42,67 @@ CREATE TABLE IF NOT EXISTS chat_logs (
     timestamp INTEGER NOT NULL,
     channel TEXT NOT NULL
 );
+-- Time-range and cursor lookups (rowid breaks timestamp ties)
+CREATE INDEX IF NOT EXISTS idx_chat_logs_ts ON chat_logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_chat_logs_user_ts ON chat_logs(username, timestamp);
+CREATE INDEX IF NOT EXISTS idx_chat_logs_channel_ts ON chat_logs(channel, timestamp);
+
+CREATE TABLE IF NOT EXISTS timed_effects (
+    username TEXT NOT NULL,
+    effect TEXT NOT NULL,
+    expires_at INTEGER NOT NULL,
+    PRIMARY KEY(username, effect)
+);
+
+CREATE TABLE IF NOT EXISTS claims (
+    username TEXT NOT NULL,
+    claim TEXT NOT NULL,
+    last_claim INTEGER NOT NULL,
+    streak INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY(username, claim)
+);
+
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bank TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    aliases TEXT DEFAULT '',
+    difficulty INTEGER DEFAULT 1,
+    category TEXT DEFAULT '',
+    season TEXT DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS cooldowns (
+    key TEXT PRIMARY KEY,
+    last REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fight_state (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
 '''
 
 class Storage:
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
         self._lock = asyncio.Lock()
+        # Per-user data versions, bumped whenever a user's XP, tokens, wins or title change.
+        # Response caches stamp entries with these to know when to refetch.
+        self._versions: Dict[str, int] = {}
+
+    def version(self, username: str) -> int:
+        return self._versions.get(username.lower(), 0)
+
+    def _bump(self, username: str):
+        self._versions[username] = self._versions.get(username, 0) + 1
+        # Leaderboard views cached by the web app key off this
+        DATA_VERSIONS.bump('users')
 
     async def init(self):
         async with aiosqlite.connect(self.db_path) as db:
+            # WAL lets web worker processes read while the bot writes (the mode persists in the file)
+            await db.execute('PRAGMA journal_mode=WAL')
             await db.executescript(SCHEMA)
             await db.commit()
 
@@ -74,24 +131,52 @@ class Storage:
             async with aiosqlite.connect(self.db_path) as db:
                 await db.execute(f'UPDATE users SET {set_clause} WHERE username = ?', values)
                 await db.commit()
+        if set(fields) != {'last_seen'}:
+            self._bump(username)
+
+    async def _increment(self, username: str, **deltas: int):
+        # Column arithmetic has to happen in SQL; binding 'xp + 5' as a value would store the string
+        username = username.lower()
+        set_clause = ', '.join(f'{k} = {k} + ?' for k in deltas.keys())
+        values = [int(v) for v in deltas.values()] + [username]
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute(f'UPDATE users SET {set_clause} WHERE username = ?', values)
+                await db.commit()
+        self._bump(username)
 
     async def add_xp(self, username: str, amount: int):
-        await self.update_user(username, xp=f'xp + {amount}')
+        await self._increment(username, xp=amount)
 
     async def add_tokens(self, username: str, amount: int):
-        await self.update_user(username, tokens=f'tokens + {amount}')
+        await self._increment(username, tokens=amount)
 
     async def add_win(self, username: str):
-        await self.update_user(username, wins='wins + 1')
+        await self._increment(username, wins=1)
+
+    async def add_rewards(self, rows: List[Tuple[str, int, int, int]]):
+        """Apply (username, xp, tokens, wins) deltas for many users in one transaction."""
+        rows = [(int(xp), int(tokens), int(wins), username.lower()) for username, xp, tokens, wins in rows]
+        if not rows:
+            return
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany(
+                    'UPDATE users SET xp = xp + ?, tokens = tokens + ?, wins = wins + ? WHERE username = ?', rows)
+                await db.commit()
+        for row in rows:
+            self._bump(row[3])
 
     async def set_last_seen(self, username: str, ts: int):
         await self.update_user(username, last_seen=ts)
 
-    async def log_chat_message(self, username: str, message: str, channel: str):
+    async def log_chat_message(self, username: str, message: str, channel: str, timestamp: Optional[int] = None):
+        # Wall-clock epoch seconds so logs can be range-queried (see /api/chat_logs)
+        ts = int(time.time() if timestamp is None else timestamp)
         async with self._lock:
             async with aiosqlite.connect(self.db_path) as db:
                 await db.execute('INSERT INTO chat_logs(username, message, timestamp, channel) VALUES (?,?,?,?)', 
-                                (username.lower(), message, int(asyncio.get_event_loop().time()), channel.lower()))
+                                (username.lower(), message, ts, channel.lower()))
                 await db.commit()
 
     async def record_redemption(self, username: str, reward: str, cost: int, created_at: int):
@@ -101,6 +186,78 @@ class Storage:
                 await db.execute('INSERT INTO redemptions(username, reward, cost, created_at) VALUES (?,?,?,?)', (username, reward, cost, created_at))
                 await db.commit()
 
+    async def purchase(self, username: str, reward: str, cost: int, created_at: int, charge: bool = True) -> Optional[int]:
+        """Debit `cost` tokens and record the redemption in one transaction.
+
+        The debit is a conditional UPDATE (`tokens >= cost`), so concurrent purchases
+        cannot overdraw the balance. With `charge=False` (channel points) only the
+        redemption is recorded. Returns the new balance, or None if funds were insufficient.
+        """
+        username = username.lower()
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('BEGIN IMMEDIATE')
+                try:
+                    await db.execute('INSERT OR IGNORE INTO users(username) VALUES (?)', (username,))
+                    if charge:
+                        cur = await db.execute('UPDATE users SET tokens = tokens - ? WHERE username = ? AND tokens >= ?',
+                                               (cost, username, cost))
+                        if cur.rowcount == 0:
+                            await db.rollback()
+                            return None
+                    await db.execute('INSERT INTO redemptions(username, reward, cost, created_at) VALUES (?,?,?,?)',
+                                     (username, reward, cost, created_at))
+                    async with db.execute('SELECT tokens FROM users WHERE username = ?', (username,)) as cur:
+                        row = await cur.fetchone()
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+        self._bump(username)
+        return row[0]
+
+    async def claim(self, username: str, claim: str, now: int, cooldown: int, reward: int,
+                    streak_window: int = 0, streak_bonus: int = 0, streak_cap: int = 0) -> Dict[str, Any]:
+        """Validate the cooldown, advance the streak and credit tokens in one transaction.
+
+        The upsert only touches an existing row when the cooldown has elapsed, so
+        two concurrent claims can't both pass.
+        """
+        username = username.lower()
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('BEGIN IMMEDIATE')
+                try:
+                    cur = await db.execute(
+                        'INSERT INTO claims(username, claim, last_claim, streak) VALUES (?,?,?,1) '
+                        'ON CONFLICT(username, claim) DO UPDATE SET '
+                        ' streak = CASE WHEN ? > 0 AND excluded.last_claim - claims.last_claim <= ? '
+                        '          THEN claims.streak + 1 ELSE 1 END,'
+                        ' last_claim = excluded.last_claim '
+                        'WHERE excluded.last_claim - claims.last_claim >= ?',
+                        (username, claim, now, streak_window, streak_window, cooldown))
+                    claimed = cur.rowcount > 0
+                    async with db.execute('SELECT last_claim, streak FROM claims WHERE username = ? AND claim = ?',
+                                          (username, claim)) as cur:
+                        last_claim, streak = await cur.fetchone()
+                    if not claimed:
+                        await db.rollback()
+                        return {'ok': False, 'remaining': max(0, last_claim + cooldown - now), 'streak': streak}
+                    bonus = streak * streak_bonus
+                    if streak_cap:
+                        bonus = min(bonus, streak_cap)
+                    total = reward + bonus
+                    await db.execute('INSERT OR IGNORE INTO users(username) VALUES (?)', (username,))
+                    await db.execute('UPDATE users SET tokens = tokens + ? WHERE username = ?', (total, username))
+                    async with db.execute('SELECT tokens FROM users WHERE username = ?', (username,)) as cur:
+                        tokens = (await cur.fetchone())[0]
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+        self._bump(username)
+        return {'ok': True, 'reward': total, 'streak': streak, 'streak_bonus': bonus, 'tokens': tokens}
+
     async def top_users_by_xp(self, limit: int = 10) -> List[Dict[str, Any]]:
         async with aiosqlite.connect(self.db_path) as db:
             async with db.execute('SELECT username, xp, wins FROM users ORDER BY xp DESC LIMIT ?', (limit,)) as cur:
@@ -135,3 +292,66 @@ class Storage:
             async with aiosqlite.connect(self.db_path) as db:
                 await db.execute('INSERT INTO metadata(key, value) VALUES (?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value', (key, value))
                 await db.commit()
+
+    async def set_title(self, username: str, title: str):
+        username = username.lower()
+        await self.set_metadata(f'title_{username}', title)
+        self._bump(username)
+
+    async def set_effect(self, username: str, effect: str, expires_at: int):
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('INSERT INTO timed_effects(username, effect, expires_at) VALUES (?,?,?) '
+                                 'ON CONFLICT(username, effect) DO UPDATE SET expires_at=excluded.expires_at',
+                                 (username.lower(), effect, expires_at))
+                await db.commit()
+
+    async def load_effects(self, now: int) -> List[tuple]:
+        """Prune expired effects and return the live ones as (username, effect, expires_at)."""
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('DELETE FROM timed_effects WHERE expires_at <= ?', (now,))
+                await db.commit()
+                async with db.execute('SELECT username, effect, expires_at FROM timed_effects') as cur:
+                    return [tuple(r) for r in await cur.fetchall()]
+
+    async def save_cooldowns(self, rows: List[Tuple[str, float, float]]):
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany('INSERT INTO cooldowns(key, last, expires_at) VALUES (?,?,?) '
+                                     'ON CONFLICT(key) DO UPDATE SET last=excluded.last, expires_at=excluded.expires_at',
+                                     rows)
+                await db.commit()
+
+    async def load_cooldowns(self, now: float) -> List[tuple]:
+        """Prune expired cooldowns and return the live ones as (key, last, expires_at)."""
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('DELETE FROM cooldowns WHERE expires_at <= ?', (now,))
+                await db.commit()
+                async with db.execute('SELECT key, last, expires_at FROM cooldowns') as cur:
+                    return [tuple(r) for r in await cur.fetchall()]
+
+    async def load_questions(self, bank: str) -> List[Dict[str, Any]]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute('SELECT question, answer, aliases, difficulty, category, season FROM questions WHERE bank = ?', (bank,)) as cur:
+                return [dict(r) for r in await cur.fetchall()]
+
+    async def checkpoint_fights(self, upserts: List[Tuple[str, str]], deletes: List[str]):
+        """Save changed fight/challenge records and drop finished ones in one transaction."""
+        async with self._lock:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute('BEGIN IMMEDIATE')
+                if upserts:
+                    await db.executemany(
+                        'INSERT INTO fight_state(key, data) VALUES(?, ?) '
+                        'ON CONFLICT(key) DO UPDATE SET data = excluded.data', upserts)
+                if deletes:
+                    await db.executemany('DELETE FROM fight_state WHERE key = ?', [(k,) for k in deletes])
+                await db.commit()
+
+    async def load_fights(self) -> List[Tuple[str, str]]:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute('SELECT key, data FROM fight_state') as cur:
+                return [tuple(r) for r in await cur.fetchall()]
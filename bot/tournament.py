@@ -0,0 +1,87 @@
+import random
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+# Tournament matches that are still undecided after this many turns go to the
+# player with more health left, so one idle pair can't stall the whole bracket
+MAX_MATCH_TURNS = 12
+
+
+class Tournament:
+    """Single-elimination bread fight tournament.
+
+    Sign-ups are collected while `open`; `seed()` then orders entrants by level
+    and each round pairs neighbours, so matches are between similar levels. A
+    round's matches start a few seconds apart and run side by side; its winners
+    keep their bracket order and are paired again until one champion is left. Match wins are tallied and
+    paid out in one batch when the tournament ends.
+    """
+
+    def __init__(self, tid: int, ctx, closes_at: float):
+        self.id = tid
+        self.ctx = ctx
+        self.closes_at = closes_at
+        self.open = True
+        self.round = 0
+        self.entrants: Dict[str, int] = {}
+        # Players not yet eliminated
+        self.alive: Set[str] = set()
+        # Winners of the current round by bracket slot (None until decided)
+        self.slots: List[Optional[str]] = []
+        # fight id -> bracket slot
+        self.matches: Dict[int, int] = {}
+        self.wins: Counter = Counter()
+        self.byes: Set[str] = set()
+        self.runner_up: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.entrants)
+
+    def join(self, player: str, level: int) -> bool:
+        if not self.open or player in self.entrants:
+            return False
+        self.entrants[player] = level
+        self.alive.add(player)
+        return True
+
+    def seed(self, rng: random.Random) -> List[str]:
+        """Entrants ordered by level, highest first (ties broken randomly)."""
+        players = list(self.entrants)
+        rng.shuffle(players)
+        players.sort(key=self.entrants.__getitem__, reverse=True)
+        return players
+
+    def pair(self, players: List[str]) -> List[Tuple[str, Optional[str]]]:
+        """Pair neighbours for the next round; with an odd count one player gets a bye."""
+        self.round += 1
+        pairs: List[Tuple[str, Optional[str]]] = []
+        rest = players
+        if len(players) % 2:
+            # Highest seed that hasn't had a bye yet sits this round out
+            bye = next((p for p in players if p not in self.byes), players[0])
+            self.byes.add(bye)
+            pairs.append((bye, None))
+            rest = [p for p in players if p != bye]
+        pairs.extend((rest[i], rest[i + 1]) for i in range(0, len(rest), 2))
+        self.slots = [a if b is None else None for a, b in pairs]
+        self.matches = {}
+        return pairs
+
+    def record(self, fight_id: int, winner: str, loser: str) -> bool:
+        """Record a match result; returns True once every match of the round is decided."""
+        slot = self.matches.pop(fight_id, None)
+        if slot is None:
+            return False
+        self.slots[slot] = winner
+        self.wins[winner] += 1
+        self.alive.discard(loser)
+        if len(self.alive) == 1:
+            self.runner_up = loser
+        return not self.matches
+
+    def is_match(self, fight_id: int) -> bool:
+        return fight_id in self.matches
+
+    @property
+    def winners(self) -> List[str]:
+        return [p for p in self.slots if p is not None]
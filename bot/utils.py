@@ -1,34 +1,328 @@
 import asyncio
-import time
-from collections import defaultdict
-from typing import Dict, Callable
+import heapq
+import logging
+from collections import defaultdict, OrderedDict
+from typing import Dict, Callable, List, Optional, Any, Awaitable, Hashable, Tuple
+
+from .clock import Clock, SYSTEM_CLOCK
+from .effects import NO_COOLDOWNS
+
+logger = logging.getLogger('BakeBot.Utils')
 
 class CooldownManager:
-    def __init__(self):
-        self._cooldowns: Dict[str, float] = {}
+    """Per-key cooldowns with bucketed expiry and a memory cap.
+
+    A key only has to be remembered until its cooldown runs out, so keys are
+    filed into `bucket_seconds`-wide buckets by expiry time and whole buckets
+    are dropped once the clock passes them (amortized O(1) per check). Beyond
+    `max_keys` live keys, the ones closest to expiring are evicted first.
+    Keys starting with one of `persist_prefixes` are written to `storage` (if
+    given) in the background and restored by `load()`, so e.g. `!work` can't
+    be reset by restarting the bot.
+    """
+
+    def __init__(self, effects=None, clock: Optional[Clock] = None, max_keys: int = 100_000,
+                 bucket_seconds: float = 5.0, storage=None, persist_prefixes: Tuple[str, ...] = ('work:',)):
+        # key -> (last trigger, expires_at)
+        self._cooldowns: Dict[str, Tuple[float, float]] = {}
+        self._buckets: Dict[int, List[str]] = {}
+        self._bucket_heap: List[int] = []
+        self.effects = effects  # optional TimedEffects; users with NO_COOLDOWNS bypass checks
+        self.clock = clock or SYSTEM_CLOCK
+        self.max_keys = max_keys
+        self.bucket_seconds = bucket_seconds
+        self.storage = storage
+        self.persist_prefixes = persist_prefixes
+        self._dirty: Dict[str, Tuple[float, float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._cooldowns)
 
-    def check(self, key: str, seconds: float) -> bool:
-        now = time.time()
-        last = self._cooldowns.get(key, 0)
-        if now - last >= seconds:
-            self._cooldowns[key] = now
+    def check(self, key: str, seconds: float, user: Optional[str] = None) -> bool:
+        if user and self.effects and self.effects.is_active(user, NO_COOLDOWNS):
             return True
-        return False
+        now = self.clock.time()
+        self._expire(now)
+        entry = self._cooldowns.get(key)
+        if entry is not None and now - entry[0] < seconds:
+            return False
+        if seconds > 0:
+            self._set(key, now, now + seconds)
+        return True
+
+    def remaining(self, key: str) -> float:
+        entry = self._cooldowns.get(key)
+        return max(0.0, entry[1] - self.clock.time()) if entry else 0.0
+
+    def _set(self, key: str, last: float, expires: float, persist: bool = True):
+        self._cooldowns[key] = (last, expires)
+        b = int(expires // self.bucket_seconds)
+        bucket = self._buckets.get(b)
+        if bucket is None:
+            bucket = self._buckets[b] = []
+            heapq.heappush(self._bucket_heap, b)
+        bucket.append(key)
+        if persist and self.storage is not None and key.startswith(self.persist_prefixes):
+            self._dirty[key] = (last, expires)
+            self._schedule_flush()
+        if len(self._cooldowns) > self.max_keys:
+            self._evict()
+
+    def _expire(self, now: float):
+        heap, width = self._bucket_heap, self.bucket_seconds
+        while heap and (heap[0] + 1) * width <= now:
+            for key in self._buckets.pop(heapq.heappop(heap)):
+                entry = self._cooldowns.get(key)
+                # Keys set again since being filed here live on in a later bucket
+                if entry is not None and entry[1] <= now:
+                    del self._cooldowns[key]
+                    self.expired += 1
+
+    def _evict(self):
+        heap = self._bucket_heap
+        while len(self._cooldowns) > self.max_keys and heap:
+            b = heap[0]
+            bucket = self._buckets[b]
+            key = bucket.pop()
+            if not bucket:
+                heapq.heappop(heap)
+                del self._buckets[b]
+            entry = self._cooldowns.get(key)
+            if entry is not None and int(entry[1] // self.bucket_seconds) == b:
+                del self._cooldowns[key]
+                self.evicted += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'live': len(self._cooldowns),
+            'buckets': len(self._buckets),
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'max_keys': self.max_keys,
+            'unsaved': len(self._dirty),
+        }
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+            except RuntimeError:
+                pass  # no loop yet; saved by the next flush
+
+    async def flush(self):
+        """Write persistent cooldowns set since the last flush in one batch."""
+        while self._dirty and self.storage is not None:
+            dirty, self._dirty = self._dirty, {}
+            try:
+                await self.storage.save_cooldowns([(k, last, exp) for k, (last, exp) in dirty.items()])
+            except Exception:
+                logger.exception('Failed to save cooldowns')
+                dirty.update(self._dirty)
+                self._dirty = dirty
+                return
+
+    async def load(self) -> int:
+        """Restore persisted cooldowns that haven't run out yet."""
+        if self.storage is None:
+            return 0
+        rows = await self.storage.load_cooldowns(self.clock.time())
+        for key, last, expires in rows:
+            self._set(key, last, expires, persist=False)
+        return len(rows)
 
 class RateLimiter:
-    def __init__(self, max_per_window: int = 20, window_seconds: int = 30):
-        self.max_per_window = max_per_window
-        self.window_seconds = window_seconds
-        self.history: Dict[str, list] = defaultdict(list)
-
-    def allow(self, user: str) -> bool:
-        now = time.time()
-        window = self.history[user]
-        window[:] = [t for t in window if now - t < self.window_seconds]
-        if len(window) < self.max_per_window:
-            window.append(now)
-            return True
-        return False
+    """Layered token-bucket limiter.
+
+    Each scope ('user', 'command', 'channel', 'global') can have a limit of
+    `(max_per_window, window_seconds)`; a bucket holds up to `max_per_window`
+    tokens and refills continuously at `max_per_window / window_seconds` per
+    second. A request must find a token in every applicable bucket and only
+    then takes one from each, so a rejection never drains the other layers.
+    Per-key state is two floats and each check is O(1); buckets left idle for
+    `idle_seconds` (by then they are full anyway) are dropped in periodic sweeps.
+    """
+
+    SCOPES = ('user', 'command', 'channel', 'global')
+
+    def __init__(self, max_per_window: int = 20, window_seconds: int = 30, clock: Optional[Clock] = None,
+                 idle_seconds: float = 300.0):
+        self.clock = clock or SYSTEM_CLOCK
+        self.idle_seconds = idle_seconds
+        self.defaults: Dict[str, Tuple[int, float]] = {'user': (max_per_window, window_seconds)}
+        self.limits: Dict[str, Tuple[int, float]] = dict(self.defaults)
+        # Per-command overrides of the 'command' scope, e.g. {'!leaderboard': (3, 30)}
+        self.command_limits: Dict[str, Tuple[int, float]] = {}
+        # (scope, key) -> [tokens, last refill]
+        self._buckets: Dict[Tuple[str, Optional[str]], List[float]] = {}
+        self._next_sweep = self.clock.time() + idle_seconds
+        self.allowed = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def configure(self, config: Optional[Dict[str, Any]]):
+        """Apply limits such as {"user": [8, 10], "global": [60, 10], "commands": {"!leaderboard": [3, 30]}}.
+
+        Scopes left out fall back to the constructor defaults; a null limit disables a scope.
+        """
+        config = config or {}
+        limits = dict(self.defaults)
+        for scope in self.SCOPES:
+            if scope in config:
+                limits[scope] = self._parse(config[scope])
+        self.limits = {k: v for k, v in limits.items() if v}
+        self.command_limits = {
+            cmd.lower(): lim for cmd, lim in
+            ((c, self._parse(v)) for c, v in (config.get('commands') or {}).items()) if lim
+        }
+        self._buckets.clear()
+
+    @staticmethod
+    def _parse(value) -> Optional[Tuple[int, float]]:
+        if not value:
+            return None
+        count, window = value
+        if int(count) <= 0 or float(window) <= 0:
+            return None
+        return int(count), float(window)
+
+    def allow(self, user: str, command: Optional[str] = None, channel: Optional[str] = None) -> bool:
+        now = self.clock.time()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        checks = []
+        for scope, key, (capacity, window) in self._layers(user, command, channel):
+            bucket = self._buckets.get((scope, key))
+            if bucket is None:
+                bucket = self._buckets[(scope, key)] = [float(capacity), now]
+            else:
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * capacity / window)
+                bucket[1] = now
+            if bucket[0] < 1:
+                self.rejected += 1
+                return False
+            checks.append(bucket)
+        for bucket in checks:
+            bucket[0] -= 1
+        self.allowed += 1
+        return True
+
+    def _layers(self, user: str, command: Optional[str], channel: Optional[str]):
+        """(scope, key, limit) for every limit that applies to this request."""
+        for scope, key, limit in (
+            ('global', None, self.limits.get('global')),
+            ('channel', channel, self.limits.get('channel') if channel else None),
+            ('command', command, (self.command_limits.get(command) or self.limits.get('command')) if command else None),
+            ('user', user, self.limits.get('user')),
+        ):
+            if limit is not None:
+                yield scope, key, limit
+
+    def _sweep(self, now: float):
+        cutoff = now - self.idle_seconds
+        for key in [k for k, b in self._buckets.items() if b[1] <= cutoff]:
+            del self._buckets[key]
+        self._next_sweep = now + self.idle_seconds
+
+    def stats(self) -> Dict[str, int]:
+        return {'buckets': len(self._buckets), 'allowed': self.allowed, 'rejected': self.rejected}
+
+class DataVersions:
+    """Process-wide change counters for cached views (e.g. 'users', 'recipes').
+
+    Writers bump the view they touched; caches compare the counter instead of
+    re-querying to decide whether a rendered response is still current.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._listeners: List[Callable[[str], None]] = []
+
+    def get(self, name: str) -> int:
+        return self._versions[name]
+
+    def bump(self, name: str):
+        self._versions[name] += 1
+        for callback in self._listeners:
+            callback(name)
+
+    def listen(self, callback: Callable[[str], None]):
+        """Call `callback(name)` after every bump (it must not block)."""
+        self._listeners.append(callback)
+
+    def unlisten(self, callback: Callable[[str], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+
+DATA_VERSIONS = DataVersions()
+
+class ResponseCache:
+    """Small LRU of rendered command responses, stamped with a data version.
+
+    An entry is served while its version still matches (and it is younger than
+    `ttl`, a backstop for writes made outside this process). Concurrent misses
+    for the same key share one in-flight load instead of each hitting the DB.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 30.0, clock: Clock = SYSTEM_CLOCK):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[Hashable, int], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: Hashable, version: int, loader: Callable[[], Awaitable[Any]]) -> Any:
+        now = self.clock.time()
+        entry = self._entries.get(key)
+        if entry and entry[0] == version and now - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+        inflight = self._inflight.get((key, version))
+        if inflight:
+            self.hits += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # this caller was cancelled itself
+            # The task doing the load was cancelled; load it ourselves
+            return await self.get(key, version, loader)
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[(key, version)] = fut
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Wake the waiters; they see CancelledError from the shield and may retry
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            fut.set_result(value)
+            self._entries[key] = (version, now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value
+        finally:
+            del self._inflight[(key, version)]
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
 
 async def run_with_timeout(coro, timeout: float):
     return await asyncio.wait_for(coro, timeout)
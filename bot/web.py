@@ -1,33 +1,298 @@
 import aiohttp
 from aiohttp import web
+import asyncio
 import aiosqlite
 import qrcode
+import qrcode.image.svg
+from qrcode.exceptions import DataOverflowError
 import io
 import logging
-import json
+import base64
+import gzip
+import hashlib
+import os
 from datetime import datetime
+from typing import Optional, Set
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+try:
+    import brotli
+except ImportError:  # optional; responses fall back to gzip
+    brotli = None
+
+from .dbpool import ConnectionPool
+from .fastjson import dumps, dumps_str, loads
+from .live import CLOSE, RESYNC, LiveFeed
+from .utils import DATA_VERSIONS, DataVersions, ResponseCache
 
 logger = logging.getLogger('BakeBot.Web')
 
+# Shared reader pool + writer, opened and closed with the app
+DB_KEY = web.AppKey('db', ConnectionPool)
+# Server-push feed for the extension panels
+LIVE_KEY = web.AppKey('live', LiveFeed)
+# Comment line sent on idle streams so proxies keep them open
+LIVE_HEARTBEAT = 15.0
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.getenv('WEB_COMPRESS_MIN_SIZE', '512'))
+# Larger bodies are compressed in a worker thread instead of on the event loop
+COMPRESS_THREAD_SIZE = 256 * 1024
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
 async def ensure_schema(db_path: str):
     async with aiosqlite.connect(db_path) as db:
         await db.execute(
             'CREATE TABLE IF NOT EXISTS recipes ('
             ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
             ' title TEXT NOT NULL,'
-            ' url TEXT DEFAULT "",'
-            ' description TEXT DEFAULT "",'
+            " url TEXT DEFAULT '',"
+            " description TEXT DEFAULT '',"
             ' visible INTEGER DEFAULT 1,'
             ' ord INTEGER DEFAULT 0,'
-            ' created_at INTEGER DEFAULT (strftime("%s","now"))'
+            " created_at INTEGER DEFAULT (strftime('%s','now'))"
             ')'
         )
         await db.commit()
 
-async def create_app(db_path: str):
+USERS_PAGE_MAX = 1000
+USERS_STREAM_CHUNK = 1000
+
+
+def encode_cursor(values) -> str:
+    """Opaque paging token for a keyset position."""
+    return base64.urlsafe_b64encode(dumps(values)).decode('ascii')
+
+
+def decode_cursor(token: str, size: int) -> list:
+    try:
+        values = loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise web.HTTPBadRequest(body=dumps({'error': 'invalid cursor'}), content_type='application/json')
+    return values
+
+
+CHAT_LOGS_MAX = 500
+
+
+def json_response(data, status: int = 200) -> web.Response:
+    """JSON response encoded straight to bytes (orjson when installed)."""
+    return web.Response(body=dumps(data), status=status, content_type='application/json')
+
+
+def parse_time(value: str) -> int:
+    """Epoch seconds from either a number or an ISO 8601 date/date-time."""
+    try:
+        return int(float(value))
+    except ValueError:
+        return int(datetime.fromisoformat(value).timestamp())
+
+
+def compress_body(body: bytes, coding: str) -> bytes:
+    if coding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, 6)
+
+
+def accepted_encodings(request) -> Set[str]:
+    """Content codings the client accepts (ignoring any with q=0)."""
+    codings = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, param = part.partition(';')
+        param = param.strip().replace(' ', '')
+        if param.startswith('q='):
+            try:
+                if float(param[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            codings.add(name.strip().lower())
+    return codings
+
+
+def pick_encoding(request) -> Optional[str]:
+    codings = accepted_encodings(request)
+    if brotli is not None and 'br' in codings:
+        return 'br'
+    return 'gzip' if 'gzip' in codings else None
+
+
+class PreparedBody:
+    """A rendered response body, serialized and compressed once and served many times."""
+
+    __slots__ = ('body', 'gzipped', 'brotli', 'etag', 'content_type')
+
+    def __init__(self, body: bytes, content_type: str, compress: bool = True):
+        self.body = body
+        # Tiny (or already compressed) bodies aren't worth the Content-Encoding overhead
+        compress = compress and len(body) >= COMPRESS_MIN_SIZE
+        self.gzipped = compress_body(body, 'gzip') if compress else None
+        self.brotli = compress_body(body, 'br') if compress and brotli is not None else None
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+        self.content_type = content_type
+
+
+def _etag_matches(request, etag: str) -> bool:
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    return header.strip() == '*' or etag in (t.strip().removeprefix('W/') for t in header.split(','))
+
+
+def prepared_response(request, prepared: PreparedBody, cache_control: str = 'no-cache') -> web.Response:
+    headers = {'ETag': prepared.etag, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if _etag_matches(request, prepared.etag):
+        return web.Response(status=304, headers=headers)
+    body = prepared.body
+    coding = pick_encoding(request) if prepared.gzipped is not None else None
+    if coding is not None:
+        body = prepared.brotli if coding == 'br' else prepared.gzipped
+        headers['Content-Encoding'] = coding
+    return web.Response(body=body, headers=headers, content_type=prepared.content_type, charset='utf-8')
+
+
+def parse_flag(value) -> int:
+    return 1 if str(value).lower() in ('1', 'true', 'yes', 'on') else 0
+
+
+def parse_int(value, name: str) -> int:
+    try:
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer') from None
+
+
+# Columns the bulk endpoints may set, in the order their SQL expects them
+RECIPE_FIELDS = ('title', 'url', 'description', 'visible', 'ord')
+USER_FIELDS = ('xp', 'tokens', 'wins', 'notes', 'is_banned')
+
+
+def recipe_fields(item: dict) -> dict:
+    """Validated recipe columns present in `item` (raises ValueError)."""
+    fields = {}
+    for key in ('title', 'url', 'description'):
+        if item.get(key) is not None:
+            fields[key] = str(item[key]).strip()
+    if 'title' in fields and not fields['title']:
+        raise ValueError('title must not be empty')
+    if item.get('visible') is not None:
+        fields['visible'] = parse_flag(item['visible'])
+    if item.get('ord') is not None:
+        fields['ord'] = parse_int(item['ord'], 'ord')
+    return fields
+
+
+def user_fields(item: dict) -> dict:
+    """Validated user columns present in `item` (raises ValueError)."""
+    fields = {}
+    for key in ('xp', 'tokens', 'wins'):
+        if item.get(key) is not None:
+            fields[key] = parse_int(item[key], key)
+    if item.get('notes') is not None:
+        fields['notes'] = str(item['notes'])
+    if item.get('is_banned') is not None:
+        fields['is_banned'] = parse_flag(item['is_banned'])
+    return fields
+
+
+def bulk_items(payload, key: str):
+    """The item list of a bulk request: the body itself or its `key` member."""
+    items = payload if isinstance(payload, list) else payload.get(key) if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        raise web.HTTPBadRequest(body=dumps({'error': f'Expected a list or {{"{key}": [...]}}'}),
+                                 content_type='application/json')
+    return items
+
+
+async def existing_keys(db, table: str, column: str, keys) -> set:
+    """Which of `keys` exist in `table`, in one query however many there are."""
+    if not keys:
+        return set()
+    sql = f'SELECT {column} FROM {table} WHERE {column} IN (SELECT value FROM json_each(?))'
+    async with db.execute(sql, (dumps_str(list(keys)),)) as cur:
+        return {row[0] for row in await cur.fetchall()}
+
+
+QR_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+QR_MAX_URL = 2048
+QR_MAX_BOX = 40
+# For content whose URL changes whenever it does (QR codes, versioned static files)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def render_qr(url: str, size: int, fmt: str) -> PreparedBody:
+    """Encode `url` as a QR image with `size`-pixel modules (CPU-bound; run off the event loop)."""
+    bio = io.BytesIO()
+    if fmt == 'svg':
+        qrcode.make(url, box_size=size, image_factory=qrcode.image.svg.SvgPathImage).save(bio)
+    else:
+        qrcode.make(url, box_size=size).save(bio, format='PNG')
+    return PreparedBody(bio.getvalue(), QR_FORMATS[fmt], compress=fmt == 'svg')
+
+
+async def create_app(db_path: str, versions: Optional[DataVersions] = None):
     app = web.Application()
     await ensure_schema(db_path)
 
+    async def db_pool(app):
+        # Connections shared by every handler for the app's lifetime
+        pool = ConnectionPool(db_path, readers=int(os.getenv('WEB_DB_READERS', '4')))
+        await pool.open()
+        app[DB_KEY] = pool
+        yield
+        await pool.close()
+
+    app.cleanup_ctx.append(db_pool)
+
+    # Leaderboard/recipe views are rebuilt only when their data version moves
+    # (or after WEB_CACHE_TTL, a backstop for writes made by another process)
+    versions = versions or DATA_VERSIONS
+    view_cache = ResponseCache(max_entries=32, ttl=float(os.getenv('WEB_CACHE_TTL', '10')))
+    # Rendered QR codes by (url, size, format); they never go stale, so only LRU eviction applies
+    qr_cache = ResponseCache(max_entries=int(os.getenv('QR_CACHE_SIZE', '256')), ttl=float('inf'))
+
+    async def live_feed(app):
+        feed = LiveFeed(versions, {
+            'leaderboard': ('users', lambda: ext_leaderboard_rows(app)),
+            'recipes': ('recipes', lambda: ext_recipe_rows(app)),
+        }, interval=float(os.getenv('LIVE_INTERVAL', '1')), poll=float(os.getenv('WEB_CACHE_TTL', '10')),
+            buffer=int(os.getenv('LIVE_CLIENT_BUFFER', '16')))
+        feed.start()
+        app[LIVE_KEY] = feed
+        yield
+        await feed.stop()
+
+    async def close_streams(app):
+        # Let open event streams finish before the server waits on its handlers
+        app[LIVE_KEY].close_all()
+
+    app.cleanup_ctx.append(live_feed)
+    app.on_shutdown.append(close_streams)
+
+    async def cached_view(request, key: str, view: str, build):
+        prepared = await view_cache.get(key, versions.get(view), build)
+        return prepared_response(request, prepared)
+
+    # Pages are compiled once here; autoescaping covers usernames and recipe text
+    templates = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']),
+                            trim_blocks=True, lstrip_blocks=True, auto_reload=False)
+    leaderboard_page = templates.get_template('public/leaderboard.html')
+    recipes_page = templates.get_template('public/recipes.html')
+    with open(os.path.join(STATIC_DIR, 'public.css'), 'rb') as f:
+        stylesheet = PreparedBody(f.read(), 'text/css')
+    # Versioned URL, so the stylesheet can be cached for good and still change on upgrade
+    stylesheet_version = stylesheet.etag.strip('"')[:10]
+    stylesheet_url = f'/static/public.css?v={stylesheet_version}'
+
     # Simple CORS middleware to allow Extension assets to fetch public JSON
     @web.middleware
     async def cors_middleware(request, handler):
@@ -42,104 +307,135 @@ async def create_app(db_path: str):
             resp.headers.setdefault('Access-Control-Allow-Headers', 'Content-Type, Authorization')
         return resp
 
-    app.middlewares.append(cors_middleware)
+    @web.middleware
+    async def compression_middleware(request, handler):
+        resp = await handler(request)
+        # Streams, prepared bodies (already encoded) and small or binary payloads pass through
+        if (not isinstance(resp, web.Response) or resp.status in (204, 304)
+                or 'Content-Encoding' in resp.headers or not isinstance(resp.body, (bytes, bytearray))
+                or len(resp.body) < COMPRESS_MIN_SIZE or not resp.content_type.startswith(COMPRESSIBLE_TYPES)):
+            return resp
+        coding = pick_encoding(request)
+        if coding is None:
+            return resp
+        body = bytes(resp.body)
+        if len(body) >= COMPRESS_THREAD_SIZE:
+            resp.body = await asyncio.to_thread(compress_body, body, coding)
+        else:
+            resp.body = compress_body(body, coding)
+        resp.headers['Content-Encoding'] = coding
+        vary = resp.headers.get('Vary')
+        resp.headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+        return resp
+
+    # Outermost first: CORS headers go on every response, compressed or not
+    app.middlewares.extend([cors_middleware, compression_middleware])
 
     async def leaderboard(request):
         logger.debug('GET /leaderboard')
-        async with aiosqlite.connect(db_path) as db:
+        return await cached_view(request, 'leaderboard', 'users', lambda: build_leaderboard(request.app))
+
+    async def build_leaderboard(app):
+        async with app[DB_KEY].reader() as db:
             async with db.execute('SELECT username, xp, wins FROM users ORDER BY xp DESC LIMIT 20') as cur:
                 rows = await cur.fetchall()
-        items = ''.join(f"<li>{u} - {xp} XP - {w} wins</li>" for u, xp, w in rows)
-        html = f"""
-        <!DOCTYPE html>
-        <html><head>
-        <title>Leaderboard</title>
-        <meta charset="utf-8">
-        <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }}
-        .container {{ max-width: 800px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; }}
-        h1 {{ color: #8b4513; text-align: center; }}
-        ul {{ list-style: none; padding: 0; }}
-        li {{ padding: 10px; margin: 5px 0; background: #fff3cd; border-left: 4px solid #d4a574; }}
-        .refresh {{ text-align: center; margin: 20px; }}
-        </style>
-        </head>
-        <body>
-        <div class="container">
-        <h1> ?? Bake-Off Leaderboard ??</h1>
-        <ul>{items}</ul>
-        <div class="refresh">
-        <button onclick="location.reload()">Refresh</button>
-        <a href="/recipes">View Recipes</a>
-        </div>
-        </div>
-        </body></html>
-        """
-        return web.Response(text=html, content_type='text/html')
+        html = leaderboard_page.render(rows=rows, stylesheet=stylesheet_url)
+        return PreparedBody(html.encode('utf-8'), 'text/html')
 
     async def recipe(request):
         logger.debug('GET /recipes')
-        async with aiosqlite.connect(db_path) as db:
+        return await cached_view(request, 'recipes', 'recipes', lambda: build_recipes(request.app))
+
+    async def build_recipes(app):
+        async with app[DB_KEY].reader() as db:
             async with db.execute('SELECT title, url, description FROM recipes WHERE visible=1 ORDER BY ord ASC, id ASC') as cur:
                 rows = await cur.fetchall()
-        cards = []
-        for title, url, desc in rows:
-            title_html = f"<a href='{url}' target='_blank'>{title}</a>" if url else title
-            desc_html = f"<p>{desc}</p>" if desc else ''
-            cards.append(f"<div class='recipe'><h3>{title_html}</h3>{desc_html}</div>")
-        items_html = "\n".join(cards) if cards else "<p>No recipes yet.</p>"
-        html = f"""
-        <!DOCTYPE html>
-        <html><head>
-        <title>Recipes</title>
-        <meta charset="utf-8">
-        <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }}
-        .container {{ max-width: 900px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; }}
-        h1 {{ color: #8b4513; text-align: center; }}
-        .recipe {{ margin: 20px 0; padding: 15px; background: #fff3cd; border-radius: 5px; border-left: 4px solid #d4a574; }}
-        a.btn {{ display:inline-block; padding:8px 12px; background:#d4a574; color:white; text-decoration:none; border-radius:6px }}
-        </style>
-        </head>
-        <body>
-        <div class="container">
-        <h1> ?? Favorite Recipes ??</h1>
-        {items_html}
-        <p><a class='btn' href="/leaderboard">Back to Leaderboard</a></p>
-        </div>
-        </body></html>
-        """
-        return web.Response(text=html, content_type='text/html')
+        # Only link real web URLs (no javascript: and the like)
+        rows = [(t, u if (u or '').startswith(('http://', 'https://')) else '', d) for t, u, d in rows]
+        html = recipes_page.render(rows=rows, stylesheet=stylesheet_url)
+        return PreparedBody(html.encode('utf-8'), 'text/html')
 
     async def users_api(request):
-        logger.debug('GET /api/users')
-        async with aiosqlite.connect(db_path) as db:
-            async with db.execute('SELECT username, xp, tokens, wins, last_seen, notes, is_banned FROM users ORDER BY xp DESC') as cur:
-                rows = await cur.fetchall()
-        
-        users = []
-        for row in rows:
-            users.append({
-                'username': row[0],
-                'xp': row[1],
-                'tokens': row[2],
-                'wins': row[3],
-                'last_seen': datetime.fromtimestamp(row[4]).strftime('%Y-%m-%d %H:%M') if row[4] else 'Never',
-                'notes': row[5] or '',
-                'is_banned': bool(row[6])
-            })
-        
-        return web.json_response(users)
+        """Users by XP (highest first), keyset-paginated on (xp, username).
+
+        Query: limit (max 1000), after (cursor from `next`), banned (0/1), min_xp,
+        seen_since (epoch seconds), prefix. `format=ndjson` streams every
+        matching user as one JSON object per line instead of a single page.
+        """
+        q = request.query
+        where, params = [], []
+        if q.get('banned') in ('0', '1'):
+            where.append('is_banned = ?')
+            params.append(int(q['banned']))
+        try:
+            if q.get('min_xp'):
+                where.append('xp >= ?')
+                params.append(int(q['min_xp']))
+            if q.get('seen_since'):
+                where.append('last_seen >= ?')
+                params.append(int(q['seen_since']))
+            limit = max(1, min(USERS_PAGE_MAX, int(q.get('limit', 100))))
+        except ValueError:
+            return json_response({'error': 'min_xp, seen_since and limit must be integers'}, status=400)
+        prefix = q.get('prefix', '').lower()
+        if prefix:
+            # Range scan on the username index instead of LIKE
+            where.append('username >= ? AND username < ?')
+            params += [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+        after = decode_cursor(q['after'], 2) if q.get('after') else None
+        logger.debug('GET /api/users filters=%s after=%s limit=%d', where, after, limit)
+
+        if q.get('format') == 'ndjson':
+            resp = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+            await resp.prepare(request)
+            while True:
+                # Connection is returned to the pool between chunks so a slow client can't hold it
+                rows = await fetch_users(request.app, where, params, after, USERS_STREAM_CHUNK)
+                if not rows:
+                    break
+                await resp.write(b''.join(dumps(user_json(r)) + b'\n' for r in rows))
+                after = (rows[-1][1], rows[-1][0])
+            await resp.write_eof()
+            return resp
+
+        rows = await fetch_users(request.app, where, params, after, limit + 1)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return json_response({
+            'data': [user_json(r) for r in rows],
+            'next': encode_cursor([rows[-1][1], rows[-1][0]]) if more else None,
+        })
+
+    async def fetch_users(app, where, params, after, limit):
+        clauses = list(where)
+        args = list(params)
+        if after is not None:
+            clauses.append('(xp < ? OR (xp = ? AND username > ?))')
+            args += [after[0], after[0], after[1]]
+        sql = 'SELECT username, xp, tokens, wins, last_seen, notes, is_banned FROM users'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY xp DESC, username ASC LIMIT ?'
+        async with app[DB_KEY].reader() as db:
+            async with db.execute(sql, (*args, limit)) as cur:
+                return await cur.fetchall()
+
+    def user_json(row):
+        # last_seen is epoch seconds (0 = never); clients format it
+        return {
+            'username': row[0], 'xp': row[1], 'tokens': row[2], 'wins': row[3],
+            'last_seen': row[4], 'notes': row[5] or '', 'is_banned': bool(row[6]),
+        }
 
     async def update_user_api(request):
         if request.method == 'POST':
-            data = await request.json()
+            data = await request.json(loads=loads)
             username = data.get('username')
             if not username:
-                return web.json_response({'error': 'Username required'}, status=400)
+                return json_response({'error': 'Username required'}, status=400)
             
             logger.info('Updating user %s via web API', username)
-            async with aiosqlite.connect(db_path) as db:
+            async with request.app[DB_KEY].writer() as db:
                 updates = []
                 values = []
                 
@@ -152,42 +448,75 @@ async def create_app(db_path: str):
                     values.append(username.lower())
                     await db.execute(f'UPDATE users SET {", ".join(updates)} WHERE username = ?', values)
                     await db.commit()
+                    versions.bump('users')
             
-            return web.json_response({'success': True})
+            return json_response({'success': True})
         
-        return web.json_response({'error': 'Method not allowed'}, status=405)
+        return json_response({'error': 'Method not allowed'}, status=405)
 
     async def chat_logs_api(request):
-        username = request.query.get('username', '').lower()
-        limit = int(request.query.get('limit', 100))
-        
-        logger.debug('GET /api/chat_logs username=%s limit=%d', username, limit)
-        
-        async with aiosqlite.connect(db_path) as db:
-            if username:
-                query = 'SELECT username, message, timestamp, channel FROM chat_logs WHERE username = ? ORDER BY timestamp DESC LIMIT ?'
-                params = (username, limit)
-            else:
-                query = 'SELECT username, message, timestamp, channel FROM chat_logs ORDER BY timestamp DESC LIMIT ?'
-                params = (limit,)
-                
-            async with db.execute(query, params) as cur:
+        """Chat logs, newest first, with cursor paging.
+
+        Query: username, channel, since/until (epoch seconds or ISO date-time),
+        limit (max 500), cursor (a `next`/`prev` token from a previous page).
+        `next` pages towards older messages, `prev` towards newer ones.
+        """
+        q = request.query
+        where, params = [], []
+        for field in ('username', 'channel'):
+            if q.get(field):
+                where.append(f'{field} = ?')
+                params.append(q[field].lower())
+        try:
+            if q.get('since'):
+                where.append('timestamp >= ?')
+                params.append(parse_time(q['since']))
+            if q.get('until'):
+                where.append('timestamp < ?')
+                params.append(parse_time(q['until']))
+            limit = max(1, min(CHAT_LOGS_MAX, int(q.get('limit', 100))))
+        except ValueError:
+            return json_response({'error': 'since/until must be epoch seconds or ISO dates; limit an integer'}, status=400)
+        direction, ts, rid = decode_cursor(q['cursor'], 3) if q.get('cursor') else ('<', None, None)
+        if direction not in ('<', '>'):
+            raise web.HTTPBadRequest(body=dumps({'error': 'invalid cursor'}), content_type='application/json')
+        if ts is not None:
+            where.append(f'(timestamp {direction} ? OR (timestamp = ? AND id {direction} ?))')
+            params += [ts, ts, rid]
+        order = 'DESC' if direction == '<' else 'ASC'
+        sql = 'SELECT id, username, message, timestamp, channel FROM chat_logs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY timestamp {order}, id {order} LIMIT ?'
+        logger.debug('GET /api/chat_logs filters=%s limit=%d', where, limit)
+
+        async with request.app[DB_KEY].reader() as db:
+            async with db.execute(sql, (*params, limit + 1)) as cur:
                 rows = await cur.fetchall()
-        
-        logs = []
-        for row in rows:
-            logs.append({
-                'username': row[0],
-                'message': row[1],
-                'timestamp': datetime.fromtimestamp(row[2]).strftime('%Y-%m-%d %H:%M:%S'),
-                'channel': row[3]
-            })
-        
-        return web.json_response(logs)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == '>':
+            rows.reverse()
+        # Paging back is always possible from a cursor page; further only if we saw an extra row
+        has_older = more if direction == '<' else True
+        has_newer = ts is not None if direction == '<' else more
+        logs = [{
+            'id': r[0],
+            'username': r[1],
+            'message': r[2],
+            'ts': r[3],
+            'timestamp': datetime.fromtimestamp(r[3]).strftime('%Y-%m-%d %H:%M:%S'),
+            'channel': r[4],
+        } for r in rows]
+        return json_response({
+            'data': logs,
+            'next': encode_cursor(['<', rows[-1][3], rows[-1][0]]) if rows and has_older else None,
+            'prev': encode_cursor(['>', rows[0][3], rows[0][0]]) if rows and has_newer else None,
+        })
 
     # Recipes API
     async def list_recipes(request):
-        async with aiosqlite.connect(db_path) as db:
+        async with request.app[DB_KEY].reader() as db:
             async with db.execute('SELECT id, title, url, description, visible, ord, created_at FROM recipes ORDER BY ord ASC, id ASC') as cur:
                 rows = await cur.fetchall()
         data = [
@@ -196,31 +525,32 @@ async def create_app(db_path: str):
                 'visible': bool(r[4]), 'ord': r[5], 'created_at': r[6]
             } for r in rows
         ]
-        return web.json_response({'data': data})
+        return json_response({'data': data})
 
     async def create_recipe(request):
         try:
-            data = await request.json()
+            data = await request.json(loads=loads)
         except Exception:
-            return web.json_response({'error': 'Invalid JSON'}, status=400)
+            return json_response({'error': 'Invalid JSON'}, status=400)
         title = (data.get('title') or '').strip()
         if not title:
-            return web.json_response({'error': 'title required'}, status=400)
+            return json_response({'error': 'title required'}, status=400)
         url = (data.get('url') or '').strip()
         desc = (data.get('description') or '').strip()
         visible = 1 if str(data.get('visible', '1')).lower() in ('1','true','yes','on') else 0
         ordv = int(data.get('ord', 0) or 0)
-        async with aiosqlite.connect(db_path) as db:
+        async with request.app[DB_KEY].writer() as db:
             await db.execute('INSERT INTO recipes(title,url,description,visible,ord) VALUES(?,?,?,?,?)', (title, url, desc, visible, ordv))
             await db.commit()
-        return web.json_response({'success': True})
+        versions.bump('recipes')
+        return json_response({'success': True})
 
     async def update_recipe(request):
         rid = request.match_info.get('rid')
         try:
-            data = await request.json()
+            data = await request.json(loads=loads)
         except Exception:
-            return web.json_response({'error': 'Invalid JSON'}, status=400)
+            return json_response({'error': 'Invalid JSON'}, status=400)
         fields = []
         values = []
         for key in ('title','url','description','ord','visible'):
@@ -231,89 +561,325 @@ async def create_app(db_path: str):
                     values.append(data[key])
                 fields.append(f"{key}=?")
         if not fields:
-            return web.json_response({'error': 'no fields'}, status=400)
-        async with aiosqlite.connect(db_path) as db:
+            return json_response({'error': 'no fields'}, status=400)
+        async with request.app[DB_KEY].writer() as db:
             await db.execute(f'UPDATE recipes SET {", ".join(fields)} WHERE id=?', (*values, rid))
             await db.commit()
-        return web.json_response({'success': True})
+        versions.bump('recipes')
+        return json_response({'success': True})
 
     async def delete_recipe(request):
         rid = request.match_info.get('rid')
-        async with aiosqlite.connect(db_path) as db:
+        async with request.app[DB_KEY].writer() as db:
             await db.execute('DELETE FROM recipes WHERE id=?', (rid,))
             await db.commit()
-        return web.json_response({'success': True})
+        versions.bump('recipes')
+        return json_response({'success': True})
 
-    async def bulk_recipes(request):
+    async def read_json(request):
         try:
-            payload = await request.json()
+            return await request.json(loads=loads)
         except Exception:
-            return web.json_response({'error': 'Invalid JSON'}, status=400)
-        items = payload if isinstance(payload, list) else payload.get('data')
-        if not isinstance(items, list):
-            return web.json_response({'error': 'Expected list of recipes'}, status=400)
-        inserted = 0
-        async with aiosqlite.connect(db_path) as db:
+            raise web.HTTPBadRequest(body=dumps({'error': 'Invalid JSON'}), content_type='application/json')
+
+    def invalid(i, error):
+        return {'index': i, 'status': 'invalid', 'error': error}
+
+    def summary(results, **counts):
+        failed = sum(1 for r in results if r['status'] in ('invalid', 'not_found'))
+        return json_response({'success': True, **counts, 'failed': failed, 'results': results})
+
+    async def bulk_recipes(request):
+        """Insert or update many recipes in one transaction.
+
+        Body: a list (or {data: [...]}) of recipes. Items with an `id` update
+        that recipe's given fields; the rest are inserted. `results` has one
+        entry per item: inserted/updated (with the id), invalid or not_found.
+        """
+        items = bulk_items(await read_json(request), 'data')
+        results = [None] * len(items)
+        inserts, updates = [], []
+        for i, it in enumerate(items):
+            if not isinstance(it, dict):
+                results[i] = invalid(i, 'not an object')
+                continue
+            try:
+                fields = recipe_fields(it)
+                rid = parse_int(it['id'], 'id') if it.get('id') is not None else None
+            except ValueError as e:
+                results[i] = invalid(i, str(e))
+                continue
+            if rid is not None:
+                updates.append((i, rid, fields))
+            elif not fields.get('title'):
+                results[i] = invalid(i, 'title required')
+            else:
+                inserts.append((i, fields))
+        async with request.app[DB_KEY].writer() as db:
+            await db.execute('BEGIN')
+            found = await existing_keys(db, 'recipes', 'id', {rid for _, rid, _ in updates})
+            rows = []
+            for i, rid, fields in updates:
+                if rid in found:
+                    rows.append((*(fields.get(k) for k in RECIPE_FIELDS), rid))
+                    results[i] = {'index': i, 'status': 'updated', 'id': rid}
+                else:
+                    results[i] = {'index': i, 'status': 'not_found', 'id': rid}
+            # Fields an item leaves out keep their current value
+            await db.executemany(
+                'UPDATE recipes SET title=COALESCE(?,title), url=COALESCE(?,url), description=COALESCE(?,description),'
+                ' visible=COALESCE(?,visible), ord=COALESCE(?,ord) WHERE id=?', rows)
+            if inserts:
+                await db.executemany(
+                    'INSERT INTO recipes(title,url,description,visible,ord) VALUES(?,?,?,?,?)',
+                    [(f['title'], f.get('url', ''), f.get('description', ''), f.get('visible', 1), f.get('ord', 0))
+                     for _, f in inserts])
+                # The write lock is held, so this transaction's ids are consecutive
+                async with db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'recipes'") as cur:
+                    first = (await cur.fetchone())[0] - len(inserts) + 1
+                for n, (i, _) in enumerate(inserts):
+                    results[i] = {'index': i, 'status': 'inserted', 'id': first + n}
+            await db.commit()
+        if rows or inserts:
+            versions.bump('recipes')
+        logger.info('Bulk recipes: %d inserted, %d updated', len(inserts), len(rows))
+        return summary(results, inserted=len(inserts), updated=len(rows))
+
+    async def reorder_recipes(request):
+        """Set display order from a list of recipe ids ({ids: [...]}): the first gets ord 0, and so on."""
+        ids = bulk_items(await read_json(request), 'ids')
+        results = []
+        rows = []
+        seen = set()
+        for i, value in enumerate(ids):
+            try:
+                rid = parse_int(value, 'id')
+            except ValueError as e:
+                results.append(invalid(i, str(e)))
+                continue
+            if rid in seen:
+                results.append(invalid(i, 'duplicate id'))
+                continue
+            seen.add(rid)
+            rows.append((i, rid))
+            results.append({'index': i, 'status': 'updated', 'id': rid, 'ord': i})
+        async with request.app[DB_KEY].writer() as db:
+            await db.execute('BEGIN')
+            found = await existing_keys(db, 'recipes', 'id', seen)
+            for r in results:
+                if r['status'] == 'updated' and r['id'] not in found:
+                    r['status'] = 'not_found'
+                    del r['ord']
+            rows = [row for row in rows if row[1] in found]
+            await db.executemany('UPDATE recipes SET ord=? WHERE id=?', rows)
+            await db.commit()
+        if rows:
+            versions.bump('recipes')
+        return summary(results, updated=len(rows))
+
+    async def bulk_delete_recipes(request):
+        """Delete recipes by id ({ids: [...]}) in one transaction."""
+        ids = bulk_items(await read_json(request), 'ids')
+        results = []
+        for i, value in enumerate(ids):
+            try:
+                results.append({'index': i, 'status': 'deleted', 'id': parse_int(value, 'id')})
+            except ValueError as e:
+                results.append(invalid(i, str(e)))
+        wanted = {r['id'] for r in results if r['status'] == 'deleted'}
+        async with request.app[DB_KEY].writer() as db:
             await db.execute('BEGIN')
+            found = await existing_keys(db, 'recipes', 'id', wanted)
+            await db.executemany('DELETE FROM recipes WHERE id=?', [(rid,) for rid in found])
+            await db.commit()
+        for r in results:
+            if r['status'] == 'deleted' and r['id'] not in found:
+                r['status'] = 'not_found'
+        if found:
+            versions.bump('recipes')
+        return summary(results, deleted=len(found))
+
+    async def bulk_users(request):
+        """Patch many users in one transaction.
+
+        Body: {users: [{username, xp?, tokens?, wins?, notes?, is_banned?}, ...]}
+        sets those fields per user, and/or {all: {xp?, tokens?, ...}} sets them
+        for every user in a single statement (e.g. a season's XP reset).
+        """
+        payload = await read_json(request)
+        if not isinstance(payload, (list, dict)):
+            return json_response({'error': 'Expected a list or object'}, status=400)
+        everyone = payload.get('all') if isinstance(payload, dict) else None
+        items = bulk_items(payload, 'users') if isinstance(payload, list) or 'users' in payload else []
+        try:
+            everyone = user_fields(everyone) if everyone else {}
+        except (ValueError, AttributeError) as e:
+            return json_response({'error': f'all: {e}'}, status=400)
+        results = [None] * len(items)
+        patches = []
+        for i, it in enumerate(items):
+            username = (it.get('username') or '').strip().lower() if isinstance(it, dict) else ''
+            if not username:
+                results[i] = invalid(i, 'username required')
+                continue
             try:
-                for it in items:
-                    title = (it.get('title') or '').strip()
-                    if not title:
-                        continue
-                    url = (it.get('url') or '').strip()
-                    desc = (it.get('description') or '').strip()
-                    vis = 1 if str(it.get('visible', '1')).lower() in ('1','true','yes','on') else 0
-                    ordv = int(it.get('ord', 0) or 0)
-                    await db.execute('INSERT INTO recipes(title,url,description,visible,ord) VALUES(?,?,?,?,?)', (title, url, desc, vis, ordv))
-                    inserted += 1
-                await db.commit()
-            except Exception:
-                await db.rollback()
-                raise
-        return web.json_response({'success': True, 'inserted': inserted})
+                fields = user_fields(it)
+            except ValueError as e:
+                results[i] = invalid(i, str(e))
+                continue
+            if not fields:
+                results[i] = invalid(i, 'no fields to update')
+                continue
+            patches.append((i, username, fields))
+        reset = 0
+        async with request.app[DB_KEY].writer() as db:
+            await db.execute('BEGIN')
+            if everyone:
+                # Keys come from USER_FIELDS, never from the request
+                cur = await db.execute(f'UPDATE users SET {", ".join(f"{k} = ?" for k in everyone)}',
+                                       tuple(everyone.values()))
+                reset = cur.rowcount
+            found = await existing_keys(db, 'users', 'username', {u for _, u, _ in patches})
+            rows = []
+            for i, username, fields in patches:
+                if username in found:
+                    rows.append((*(fields.get(k) for k in USER_FIELDS), username))
+                    results[i] = {'index': i, 'status': 'updated', 'username': username}
+                else:
+                    results[i] = {'index': i, 'status': 'not_found', 'username': username}
+            await db.executemany(
+                'UPDATE users SET xp=COALESCE(?,xp), tokens=COALESCE(?,tokens), wins=COALESCE(?,wins),'
+                ' notes=COALESCE(?,notes), is_banned=COALESCE(?,is_banned) WHERE username=?', rows)
+            await db.commit()
+        if rows or reset:
+            versions.bump('users')
+        logger.info('Bulk user patch: %d users updated, %d by all', len(rows), reset)
+        return summary(results, updated=len(rows), all_updated=reset)
 
     async def qr(request):
+        """QR code for `url`. Query: size (pixels per module, 1-40, default 10), format (png/svg)."""
         url = request.query.get('url', 'https://twitch.tv')
-        logger.debug('GET /qr url=%s', url)
-        img = qrcode.make(url)
-        bio = io.BytesIO()
-        img.save(bio, format='PNG')
-        return web.Response(body=bio.getvalue(), content_type='image/png')
+        fmt = request.query.get('format', 'png').lower()
+        try:
+            size = max(1, min(QR_MAX_BOX, int(request.query.get('size', 10))))
+        except ValueError:
+            return json_response({'error': 'size must be an integer'}, status=400)
+        if fmt not in QR_FORMATS:
+            return json_response({'error': 'format must be png or svg'}, status=400)
+        if len(url) > QR_MAX_URL:
+            return json_response({'error': 'url too long'}, status=400)
+        logger.debug('GET /qr url=%s size=%d format=%s', url, size, fmt)
+        try:
+            prepared = await qr_cache.get((url, size, fmt), 0, lambda: asyncio.to_thread(render_qr, url, size, fmt))
+        except (DataOverflowError, ValueError):
+            # Newer qrcode releases report too much data as an invalid version
+            return json_response({'error': 'url too long for a QR code'}, status=400)
+        return prepared_response(request, prepared, IMMUTABLE_CACHE_CONTROL)
 
     # Extension JSON endpoints
     async def ext_leaderboard(request):
-        async with aiosqlite.connect(db_path) as db:
+        return await cached_view(request, 'ext_leaderboard', 'users', lambda: build_ext_leaderboard(request.app))
+
+    async def build_ext_leaderboard(app):
+        data = await ext_leaderboard_rows(app)
+        return PreparedBody(dumps({'data': data}), 'application/json')
+
+    async def ext_leaderboard_rows(app):
+        async with app[DB_KEY].reader() as db:
             async with db.execute('SELECT username, xp, wins FROM users ORDER BY xp DESC LIMIT 20') as cur:
                 rows = await cur.fetchall()
-        data = [
+        return [
             { 'username': u, 'xp': xp, 'wins': w } for (u, xp, w) in rows
         ]
-        return web.json_response({'data': data})
 
     async def ext_recipes(request):
-        async with aiosqlite.connect(db_path) as db:
+        return await cached_view(request, 'ext_recipes', 'recipes', lambda: build_ext_recipes(request.app))
+
+    async def build_ext_recipes(app):
+        data = await ext_recipe_rows(app)
+        return PreparedBody(dumps({'data': data}), 'application/json')
+
+    async def ext_recipe_rows(app):
+        async with app[DB_KEY].reader() as db:
             async with db.execute('SELECT title, url, description FROM recipes WHERE visible=1 ORDER BY ord ASC, id ASC') as cur:
                 rows = await cur.fetchall()
-        data = [
+        return [
             { 'title': t, 'url': u, 'description': d } for (t, u, d) in rows
         ]
-        return web.json_response({'data': data})
+
+    async def ext_stream(request):
+        """Server-sent events: `leaderboard` and `recipes` diffs as they change.
+
+        Each event is {size, set: [[index, row], ...], reset?}; `reset` events
+        carry the whole list (sent on connect and after a client falls behind).
+        """
+        feed = request.app[LIVE_KEY]
+        sub = await feed.subscribe()
+        resp = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            # Set here since the stream is sent before cors_middleware sees the response
+            'Access-Control-Allow-Origin': '*',
+        })
+        try:
+            await resp.prepare(request)
+            await resp.write(b'retry: 5000\n\n')
+            while True:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), LIVE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    await resp.write(b': ping\n\n')
+                    continue
+                if item is CLOSE:
+                    break
+                if item is RESYNC:
+                    sub.skip_to, body = feed.snapshot_events()
+                    await resp.write(body)
+                    continue
+                seq, event = item
+                if seq > sub.skip_to:
+                    await resp.write(event)
+            await resp.write_eof()
+        except ConnectionResetError:
+            pass  # viewer closed the panel
+        finally:
+            feed.unsubscribe(sub)
+        return resp
+
+    async def static_css(request):
+        # Pages link the versioned URL; anything else may be an outdated copy
+        cache = IMMUTABLE_CACHE_CONTROL if request.query.get('v') == stylesheet_version else 'public, max-age=3600'
+        return prepared_response(request, stylesheet, cache)
+
+    async def db_stats(request):
+        return json_response(request.app[DB_KEY].stats())
+
+    async def live_stats(request):
+        return json_response(request.app[LIVE_KEY].stats())
 
     app.add_routes([
         web.get('/leaderboard', leaderboard),
         web.get('/recipes', recipe),
         web.get('/qr', qr),
+        web.get('/static/public.css', static_css),
         web.get('/api/users', users_api),
         web.post('/api/users/update', update_user_api),
+        web.post('/api/users/bulk', bulk_users),
         web.get('/api/chat_logs', chat_logs_api),
         web.get('/api/recipes', list_recipes),
         web.post('/api/recipes', create_recipe),
         web.put('/api/recipes/{rid}', update_recipe),
         web.delete('/api/recipes/{rid}', delete_recipe),
         web.post('/api/recipes/bulk', bulk_recipes),
+        web.post('/api/recipes/reorder', reorder_recipes),
+        web.post('/api/recipes/bulk_delete', bulk_delete_recipes),
+        web.get('/api/db_stats', db_stats),
+        web.get('/api/live_stats', live_stats),
         # Extension endpoints
         web.get('/ext/leaderboard', ext_leaderboard),
         web.get('/ext/recipes', ext_recipes),
+        web.get('/ext/stream', ext_stream),
     ])
 
     return app
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import multiprocessing
+import re
+import signal
+import socket
+from typing import List, Optional, Set
+
+from aiohttp import web
+
+from .logging_config import setup_logging
+from .utils import DATA_VERSIONS, DataVersions
+
+logger = logging.getLogger('BakeBot.WebProc')
+
+# Data versions a worker bumps after (re)connecting, since it may have missed signals
+VIEWS = ('users', 'recipes')
+_NAME = re.compile(rb'[a-z_]{1,32}')
+# Unsent bytes allowed per worker before the hub gives up on it (it resyncs on reconnect)
+MAX_PENDING = 64 * 1024
+
+
+class InvalidationHub:
+    """Relays data-version bumps between the bot and its web worker processes.
+
+    Listens on a loopback port and writes one line per bump (the version
+    name) to every connected worker. Workers report their own writes the
+    same way; those are applied here and passed on to the other workers.
+    Sends never wait on a worker, so a stuck web process can't slow chat.
+    """
+
+    def __init__(self, versions: DataVersions = DATA_VERSIONS):
+        self.versions = versions
+        self.port = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._relaying = False
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        self._server = await asyncio.start_server(self._serve, host, port, limit=256)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.versions.listen(self._on_bump)
+
+    async def stop(self):
+        self.versions.unlisten(self._on_bump)
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _on_bump(self, name: str):
+        if not self._relaying:
+            self._send(name.encode('ascii') + b'\n')
+
+    def _send(self, line: bytes, skip: Optional[asyncio.StreamWriter] = None):
+        for writer in list(self._clients):
+            if writer is skip:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_PENDING:
+                logger.warning('Web worker is not reading invalidations; disconnecting it')
+                self._clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                name = line.strip()
+                if not _NAME.fullmatch(name):
+                    logger.warning('Ignoring malformed invalidation from a web worker')
+                    break
+                self._send(name + b'\n', skip=writer)
+                self._relaying = True
+                try:
+                    self.versions.bump(name.decode('ascii'))
+                finally:
+                    self._relaying = False
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+
+class InvalidationClient:
+    """Worker side of InvalidationHub: applies relayed bumps and reports local ones."""
+
+    def __init__(self, port: int, versions: DataVersions = DATA_VERSIONS, host: str = '127.0.0.1'):
+        self.host = host
+        self.port = port
+        self.versions = versions
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._applying = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.versions.listen(self._on_bump)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.versions.unlisten(self._on_bump)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _on_bump(self, name: str):
+        if self._writer is not None and not self._applying:
+            self._writer.write(name.encode('ascii') + b'\n')
+
+    def _apply(self, name: str):
+        self._applying = True
+        try:
+            self.versions.bump(name)
+        finally:
+            self._applying = False
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port, limit=256)
+            except OSError:
+                await asyncio.sleep(1)
+                continue
+            self._writer = writer
+            for name in VIEWS:
+                self._apply(name)
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    name = line.strip()
+                    if _NAME.fullmatch(name):
+                        self._apply(name.decode('ascii'))
+            except (ConnectionError, ValueError):
+                pass
+            finally:
+                self._writer = None
+                writer.close()
+            logger.warning('Lost the bot invalidation channel; reconnecting')
+            await asyncio.sleep(1)
+
+
+async def _serve(index: int, db_path: str, host: str, port: int, hub_port: int, reuse_port: bool):
+    from .web import create_app
+
+    app = await create_app(db_path)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, reuse_port=reuse_port or None)
+    await site.start()
+    client = InvalidationClient(hub_port)
+    client.start()
+    logger.info('Web worker %d serving http://%s:%s', index, host, port)
+
+    stop = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows: terminate() ends the process outright
+
+    async def watch_parent():
+        # Don't outlive a bot that was killed without stopping its workers
+        parent = multiprocessing.parent_process()
+        while parent is None or parent.is_alive():
+            await asyncio.sleep(2)
+        stop.set()
+
+    watchdog = asyncio.create_task(watch_parent())
+    await stop.wait()
+    watchdog.cancel()
+    await client.stop()
+    await runner.cleanup()
+
+
+def run_worker(index: int, db_path: str, host: str, port: int, hub_port: int, reuse_port: bool):
+    """Process entry point for one web worker."""
+    setup_logging(f'web-{index}.log')
+    try:
+        asyncio.run(_serve(index, db_path, host, port, hub_port, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+class WebWorkers:
+    """Runs the public web app in `count` separate processes.
+
+    Web requests then never share an event loop (or GIL) with chat handling.
+    With more than one worker they all bind the same port via SO_REUSEPORT
+    and the kernel spreads connections across them. Workers read the shared
+    database (WAL mode) and learn about the bot's writes through an
+    InvalidationHub; one that exits unexpectedly is restarted.
+    """
+
+    def __init__(self, db_path: str, host: str, port: int, count: int = 1,
+                 versions: DataVersions = DATA_VERSIONS):
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.count = max(1, count)
+        self.hub = InvalidationHub(versions)
+        self.reuse_port = self.count > 1
+        self._procs: List[Optional[multiprocessing.Process]] = []
+        self._ctx = multiprocessing.get_context('spawn')
+        self._monitor: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+            logger.warning('SO_REUSEPORT is not available here; running a single web worker')
+            self.count, self.reuse_port = 1, False
+        await self.hub.start()
+        self._procs = [self._spawn(i) for i in range(self.count)]
+        self._monitor = asyncio.create_task(self._watch())
+        logger.info('Started %d web worker process(es) on http://%s:%s', self.count, self.host, self.port)
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        proc = self._ctx.Process(target=run_worker, name=f'bakebot-web-{index}', daemon=True,
+                                 args=(index, self.db_path, self.host, self.port, self.hub.port, self.reuse_port))
+        proc.start()
+        return proc
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(5)
+            for i, proc in enumerate(self._procs):
+                if not proc.is_alive():
+                    logger.error('Web worker %d exited with code %s; restarting', i, proc.exitcode)
+                    self._procs[i] = self._spawn(i)
+
+    async def stop(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        for proc in self._procs:
+            proc.terminate()
+        for proc in self._procs:
+            await asyncio.to_thread(proc.join, 5)
+            if proc.is_alive():
+                proc.kill()
+        self._procs = []
+        await self.hub.stop()
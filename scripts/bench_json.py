@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Compare response serialization: stdlib json (what web.json_response did) vs bot.fastjson.
+
+Payloads are shaped like a full /api/users page and a full /api/chat_logs page.
+Install orjson to see the fast path; without it both columns use stdlib json.
+"""
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bot import fastjson  # noqa: E402
+
+rng = random.Random(42)
+WORDS = ['bread', 'sourdough', 'crumb', 'proof', 'knead', 'oven', 'flour', 'butter', 'gg', 'lol', 'poggers']
+
+
+def users_payload(n=1000):
+    data = [{
+        'username': f'viewer_{i:05d}', 'xp': rng.randint(0, 500_000), 'tokens': rng.randint(0, 10_000),
+        'wins': rng.randint(0, 500), 'last_seen': 1_700_000_000 + rng.randint(0, 10_000_000),
+        'notes': '' if rng.random() < 0.9 else 'regular', 'is_banned': rng.random() < 0.01,
+    } for i in range(n)]
+    return {'data': data, 'next': 'WzEyMzQsInZpZXdlcl8wMTAwMCJd'}
+
+
+def chat_logs_payload(n=500):
+    data = [{
+        'id': 1_000_000 - i, 'username': f'viewer_{rng.randint(0, 9999):05d}',
+        'message': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 25))),
+        'ts': 1_700_000_000 - i * 3, 'timestamp': '2023-11-14 22:13:20', 'channel': 'bakingchannel',
+    } for i in range(n)]
+    return {'data': data, 'next': 'WyI8IiwxNjk5OTk4NTAyLDk5OTUwMF0=', 'prev': None}
+
+
+def stdlib(obj):
+    return json.dumps(obj).encode('utf-8')
+
+
+def bench(name, payload, number=200):
+    size = len(stdlib(payload))
+    before = min(timeit.repeat(lambda: stdlib(payload), number=number, repeat=5)) / number
+    after = min(timeit.repeat(lambda: fastjson.dumps(payload), number=number, repeat=5)) / number
+    print(f'{name:<16}{size / 1024:>8.0f} KiB{before * 1e6:>12.0f} us{after * 1e6:>12.0f} us{before / after:>9.1f}x')
+
+
+if __name__ == '__main__':
+    print(f'fastjson backend: {fastjson.BACKEND}')
+    print(f'{"payload":<16}{"size":>12}{"stdlib":>15}{"fastjson":>15}{"speedup":>10}')
+    bench('/api/users', users_payload())
+    bench('/api/chat_logs', chat_logs_payload())
@@ -36,9 +36,61 @@
     refresh();
   }
 
+  let stream = null;
+
   function refresh(){
-    loadLeaderboard();
-    loadRecipes();
+    if(stream){ stream.close(); stream = null; }
+    if(baseUrl && window.EventSource){
+      openStream();
+    } else {
+      loadLeaderboard();
+      loadRecipes();
+    }
+  }
+
+  // Live updates: the bot pushes only what changed; fall back to one-off
+  // fetches if the stream endpoint can't be reached at all
+  function openStream(){
+    const url = baseUrl.replace(/\/$/,'') + '/ext/stream';
+    let received = false;
+    const es = stream = new EventSource(url);
+    es.addEventListener('leaderboard', (e) => {
+      received = true;
+      applyDiff('lb-list', 'lb-status', JSON.parse(e.data), renderUser, 'No data yet.');
+    });
+    es.addEventListener('recipes', (e) => {
+      received = true;
+      applyDiff('rc-list', 'rc-status', JSON.parse(e.data), renderRecipe, 'No recipes yet.');
+    });
+    es.onerror = () => {
+      // EventSource reconnects by itself once it has worked
+      if(!received && stream === es){
+        es.close();
+        stream = null;
+        loadLeaderboard();
+        loadRecipes();
+      }
+    };
+  }
+
+  // Diff: { size, set: [[index, item], ...], reset? }
+  function applyDiff(listId, statusId, diff, render, emptyText){
+    const list = document.getElementById(listId);
+    if(diff.reset){ list.innerHTML = ''; }
+    while(list.children.length > diff.size){ list.removeChild(list.lastChild); }
+    while(list.children.length < diff.size){ list.appendChild(document.createElement('li')); }
+    diff.set.forEach(([i, item]) => render(list.children[i], item, i));
+    document.getElementById(statusId).textContent = diff.size ? '' : emptyText;
+  }
+
+  function renderUser(li, u, i){
+    li.innerHTML = `<span>#${i+1} ${u.username}</span><span class="meta">${u.xp} XP \u00b7 ${u.wins} wins</span>`;
+  }
+
+  function renderRecipe(li, r){
+    const link = r.url ? `<a href="${r.url}" target="_blank">${r.title}</a>` : r.title;
+    const desc = r.description ? `<div class="meta">${r.description}</div>` : '';
+    li.innerHTML = `${link}${desc}`;
   }
 
   async function loadLeaderboard(){
@@ -54,7 +106,7 @@
       status.textContent = '';
       (d.data||[]).forEach((u,i) => {
         const li = document.createElement('li');
-        li.innerHTML = `<span>#${i+1} ${u.username}</span><span class="meta">${u.xp} XP  ${u.wins} wins</span>`;
+        renderUser(li, u, i);
         list.appendChild(li);
       });
       if(list.children.length===0){ status.textContent = 'No data yet.'; }
@@ -74,9 +126,7 @@
       status.textContent = '';
       (d.data||[]).forEach((r) => {
         const li = document.createElement('li');
-        const link = r.url ? `<a href="${r.url}" target="_blank">${r.title}</a>` : r.title;
-        const desc = r.description ? `<div class="meta">${r.description}</div>` : '';
-        li.innerHTML = `${link}${desc}`;
+        renderRecipe(li, r);
         list.appendChild(li);
       });
       if(list.children.length===0){ status.textContent = 'No recipes yet.'; }